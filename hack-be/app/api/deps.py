@@ -2,7 +2,6 @@ from collections.abc import Generator
 from typing import Annotated
 import redis.asyncio as redis
 
-import jwt
 from fastapi import Cookie, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
@@ -32,24 +31,10 @@ cookie_scheme = APIKeyCookie(name="access_token")
 CookieDep = Annotated[str, Depends(cookie_scheme)]
 
 
-def get_current_user(access_token: CookieDep) -> LDAPUser:
+async def get_current_user(access_token: CookieDep) -> LDAPUser:
     try:
-
-        payload = jwt.decode(
-            access_token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        if not payload:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authenticated",
-            )
-
-        token_data = LDAPUser(**payload["sub"])
-        if not token_data:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        return token_data
-    except (InvalidTokenError, ValidationError):
+        return await security.get_token_user(access_token)
+    except (InvalidTokenError, ValidationError, KeyError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
@@ -57,3 +42,16 @@ def get_current_user(access_token: CookieDep) -> LDAPUser:
 
 
 CurrentUser = Annotated[LDAPUser, Depends(get_current_user)]
+
+
+async def get_admin_user(user: CurrentUser) -> LDAPUser:
+    if user.username not in settings.ADMIN_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return user
+
+
+AdminUser = Annotated[LDAPUser, Depends(get_admin_user)]
+
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import cavecad, images, login, private
+from app.api.routes import cavecad, images, login, private, profiles
 from app.api.routes import stream_r as stream
 from app.api.routes import utils, websocket
 from app.api.secure import secure_router
@@ -10,6 +10,9 @@ api_router = APIRouter()
 api_router.include_router(websocket.router)
 api_router.include_router(stream.router)
 
+if settings.PROFILING_ENABLED:
+    api_router.include_router(profiles.router)
+
 # api_router.include_router(login.router)
 # api_router.include_router(secure_router)
 # api_router.include_router(utils.router)
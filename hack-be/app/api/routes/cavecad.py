@@ -1,42 +1,81 @@
+import hashlib
 import logging
+from typing import Annotated
+
 from fastapi import (
     APIRouter,
+    Header,
+    HTTPException,
 )
-from fastapi.responses import JSONResponse
-import pandas as pd
-
 
 from app.api.deps import CurrentUser
-from app.core.config import settings
-from app.services.cavecad.main import create_and_dump_csv, fetch_cavecad_data
+from app.core.queue import export_queue
+from app.core.responses import ORJSONResponse
 from app.services.cavecad.schema import CavecadSubmitElement
-from app.services.cavecad.submission import save_submitted_results
-from asyncer import asyncify
 
 router = APIRouter(prefix="/cavecad", tags=["Cavecad CSV"])
 logger = logging.getLogger(__name__)
 
 
-@router.post("/")
-async def POST(input: CavecadSubmitElement, current_user: CurrentUser):
+@router.post("/", status_code=202)
+async def POST(
+    input: CavecadSubmitElement,
+    current_user: CurrentUser,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+):
+    """
+    Queues the batch for app/worker.py, which saves it and regenerates the CaveCAD
+    exports. Status changes are published on the WebSocket channel under the job
+    id; progress, result and error are read from GET /cavecad/jobs/{job_id}.
+
+    A repeated submission (same Idempotency-Key, or the same batch when no key is
+    sent) returns the original job and its outcome instead of queueing it again,
+    unless that job failed for good; then it is queued anew.
+    """
     try:
-        drawpoints = [record.drawpoint_name for record in input.data]
-        cavecad_df = await fetch_cavecad_data(drawpoints)
+        batch_hash = hashlib.sha256(input.model_dump_json().encode()).hexdigest()
+        job_id, first_hash = await export_queue.enqueue_once(
+            f"{current_user.username}:{idempotency_key or batch_hash}",
+            batch_hash,
+            {
+                "submission": input.model_dump(mode="json"),
+                "user": current_user.model_dump(),
+            },
+            owner=current_user.username,
+        )
+    except Exception as e:
+        logger.error(e)
+        return ORJSONResponse("ERROR", status_code=500)
 
-        data = []
-        for each_record in input.data:
-            _data = await save_submitted_results(each_record, current_user)
-            data.append(_data)
-        # return drawpoints
+    if first_hash is None:
+        return {"job_id": job_id, "status": "queued"}
 
-        records = [
-            {**x.model_dump(), "username": current_user.username} for x in input.data
-        ]
+    if first_hash != batch_hash:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different batch",
+        )
 
-        records_df = pd.DataFrame(records)
-        await asyncify(create_and_dump_csv)(records_df, cavecad_df, settings.UAT_PATHS)
+    job = await export_queue.get(job_id) or {}
+    return ORJSONResponse(
+        {
+            "job_id": job_id,
+            "status": job.get("status", "expired"),
+            "result": job.get("result"),
+        },
+        headers={"Idempotent-Replayed": "true"},
+    )
 
-        return data
-    except Exception as e:
-        logger.error(e)
-        return JSONResponse("ERROR", status_code=500)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: CurrentUser):
+    job = await export_queue.get(job_id)
+    # Other users' jobs are reported as missing, not as forbidden
+    if not job or job.get("owner") != current_user.username:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job.pop("payload")
+    job.pop("owner")
+    job.pop("dedup", None)
+    job.pop("traceparent", None)
+    return {"job_id": job_id, **job}
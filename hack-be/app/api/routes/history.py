@@ -2,7 +2,7 @@ import logging
 from fastapi import (
     APIRouter,
 )
-from fastapi.responses import JSONResponse
+from app.core.responses import ORJSONResponse
 
 from app.services.history import get_image_history
 
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 async def get():
     try:
         results = await get_image_history()
-        return JSONResponse({"results": results})
+        return ORJSONResponse({"results": results})
     except Exception as e:
         logger.error(e)
-        return JSONResponse("ERROR", status_code=500)
+        return ORJSONResponse("ERROR", status_code=500)
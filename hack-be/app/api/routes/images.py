@@ -5,7 +5,7 @@ from fastapi import (
     HTTPException,
     UploadFile,
 )
-from fastapi.responses import JSONResponse
+from app.core.responses import ORJSONResponse
 import aiofiles
 
 from app.core.pagination import Paginated
@@ -22,11 +22,11 @@ async def get(pagination: Paginated):
     try:
 
         results = await get_all_images(pagination)
-        return JSONResponse({"results": results})
+        return ORJSONResponse({"results": results})
 
     except Exception as e:
         logger.error(e)
-        return JSONResponse("ERROR", status_code=500)
+        return ORJSONResponse("ERROR", status_code=500)
 
 
 @router.post("/upload/")
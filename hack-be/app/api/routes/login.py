@@ -1,23 +1,44 @@
-from datetime import timedelta
 import stat
 from typing import Annotated, Any, Dict
 
 from fastapi import APIRouter, Cookie, Depends, HTTPException, Response
-from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.deps import CookieDep, CurrentUser, SessionDep
 from app.core import security
 from app.core.config import settings
-from app.core.ldap import authenticate_ldap
+from app.core.ldap import authenticate_ldap_async
+from app.core.responses import ORJSONResponse
 from app.models import LDAPUser, Token, UserPublic
 import re
 
 router = APIRouter(tags=["login"])
 
 
+def set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    response.set_cookie(
+        key=settings.TOKEN_KEY,
+        value=access_token,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,  # Convert minutes to seconds
+        path="/",
+    )
+    # Only the API needs the refresh token, never send it to anything else
+    response.set_cookie(
+        key=settings.REFRESH_TOKEN_KEY,
+        value=refresh_token,
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        max_age=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+        path=settings.API_V1_STR,
+    )
+
+
 @router.post("/login/access-token")
-def login_access_token(
+async def login_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], response: Response
 ) -> dict[str, Any]:
     """
@@ -27,12 +48,11 @@ def login_access_token(
     username = re.sub(r"@riotinto\.com", "", username, flags=re.IGNORECASE)
     password = form_data.password.strip()
 
-    user, detail = authenticate_ldap(username, password)
+    user, detail = await authenticate_ldap_async(username, password)
 
     if not user:
         raise HTTPException(status_code=400, detail=detail)
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     human_readable_data = LDAPUser(
         **{
             "name": user.get("attributes").get("displayName")[0],
@@ -42,27 +62,53 @@ def login_access_token(
         }
     )
 
-    _token = security.create_access_token(
-        human_readable_data.__dict__,
-        expires_delta=access_token_expires,
-    )
+    _token, _refresh_token = await security.create_session(human_readable_data)
+    set_auth_cookies(response, _token, _refresh_token)
 
-    response.set_cookie(
-        key=settings.TOKEN_KEY,
-        value=_token,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,  # Convert minutes to seconds
-        path="/",
+    return {
+        **human_readable_data.__dict__,
+        "token": _token,
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+@router.post("/login/refresh")
+async def refresh_access_token(
+    response: Response,
+    refresh_token: Annotated[
+        str | None, Cookie(alias=settings.REFRESH_TOKEN_KEY)
+    ] = None,
+) -> dict[str, Any]:
+    """
+    Rotate the refresh token cookie and issue a new short-lived access token
+    """
+    rotated = (
+        await security.rotate_refresh_token(refresh_token) if refresh_token else None
     )
+    if not rotated:
+        raise HTTPException(status_code=401, detail="Session expired")
+
+    user, _token, _refresh_token = rotated
+    set_auth_cookies(response, _token, _refresh_token)
 
-    return {**human_readable_data.__dict__, "token": _token}
+    return {
+        **user.__dict__,
+        "token": _token,
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
 
 
 @router.get("/logout")
-def kill_cookie(response: Response):
+async def kill_cookie(
+    response: Response,
+    access_token: Annotated[str | None, Cookie(alias=settings.TOKEN_KEY)] = None,
+    refresh_token: Annotated[
+        str | None, Cookie(alias=settings.REFRESH_TOKEN_KEY)
+    ] = None,
+):
+    await security.end_session(access_token, refresh_token)
     response.delete_cookie(key=settings.TOKEN_KEY)
+    response.delete_cookie(key=settings.REFRESH_TOKEN_KEY, path=settings.API_V1_STR)
     return {"suxess": True}
 
 
@@ -75,11 +121,11 @@ def test_token(current_user: CurrentUser) -> CurrentUser:
 
 
 @router.get("/403")
-def return_403(current_user: CookieDep) -> JSONResponse:
+def return_403(current_user: CookieDep) -> ORJSONResponse:
     """
     403
     """
-    return JSONResponse(status_code=403, content={})
+    return ORJSONResponse(status_code=403, content={})
 
 
 @router.get("/secure-cookie")
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.api.deps import AdminUser
+from app.core.profiling import profiles
+from app.core.responses import ORJSONResponse
+
+router = APIRouter(prefix="/profiles", tags=["Request profiles"])
+
+
+@router.get("/")
+def list_profiles(_admin: AdminUser):
+    """
+    Summaries of the stored request profiles, newest first
+    """
+    return ORJSONResponse({"results": profiles.summaries()})
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, _admin: AdminUser):
+    """
+    The flame graph of one profile, as returned in the X-Profile-Id header
+    """
+    path = profiles.html_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/html")
@@ -1,14 +1,35 @@
-import json
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timezone
+import uuid
+from datetime import date
 from typing import Annotated
 
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse, StreamingResponse
+from cachetools import TTLCache
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from pydantic_ai.messages import ModelMessage
+from pydantic_ai import RunUsage
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.messages import (
+    FunctionToolCallEvent,
+    ModelMessagesTypeAdapter,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ToolCallPart,
+)
 
+from app.api.deps import AdminUser, CurrentUser
+from app.core.responses import ORJSONResponse, dumps
+from app.core.sse import EventStream, parse_event_id, replay
+from app.core.usage import usage_governor
+from app.services.chat_cache import chat_cache
+from src.chat_history import fetch_runs, load_history, save_run
+from src.config import settings as agent_settings
 from src.db import DbDep
+from src.insight_pipeline import InsightGenerationError, refresh_insights
 from src.stream_test import agent
 
 router = APIRouter(prefix="/stream", tags=["Historical data submitted to cavecad"])
@@ -17,39 +38,288 @@ logger = logging.getLogger(__name__)
 
 class ChatPrompt(BaseModel):
     prompt: str
-    previous: list[str] | None = []
+    # Omit to start a new conversation, its id comes back in X-Conversation-Id
+    conversation_id: uuid.UUID | None = None
+    # Opt in to answers cached for similar first prompts
+    cache: bool = False
+
+
+INSIGHT_COLUMNS = {
+    "id",
+    "type",
+    "title",
+    "description",
+    "confidence",
+    "impact",
+    "color",
+    "bg_color",
+    "created_at",
+}
+# (columns, limit, before) -> (etag, body)
+_insights_cache: TTLCache = TTLCache(
+    maxsize=256, ttl=agent_settings.INSIGHTS_CACHE_SECONDS
+)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header lists etag, or is *. The comparison is
+    weak, as RFC 9110 asks for If-None-Match, so W/"x" matches "x".
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in {
+        tag.removeprefix("W/") for tag in tags
+    }
 
 
 @router.get("/")
-async def get(session: DbDep):
-    try:
-        response = await session.table("insights").select("*").execute()
-        return JSONResponse(response.data, status_code=200)
+async def get(
+    request: Request,
+    session: DbDep,
+    fields: str | None = None,
+    before: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = agent_settings.INSIGHTS_PAGE_SIZE,
+):
+    """
+    Insights newest first. fields is a comma separated column list; pass
+    next_before as before for the next page. Answers 304 to a matching
+    If-None-Match.
+    """
+    requested = {field.strip() for field in (fields or "").split(",")} - {""}
+    columns = tuple(sorted(requested or INSIGHT_COLUMNS))
+    unknown = set(columns) - INSIGHT_COLUMNS
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown fields: {sorted(unknown)}"
+        )
+
+    cache_key = (columns, limit, before)
+    cached = _insights_cache.get(cache_key)
+    if cached is None:
+        # The cursor needs the id even when the caller did not ask for it. Sorted,
+        # a set's order differs between workers and so would the body and ETag
+        query = session.table("insights").select(",".join(sorted({*columns, "id"})))
+        if before is not None:
+            query = query.lt("id", before)
+        try:
+            response = await query.order("id", desc=True).limit(limit).execute()
+        except Exception as e:
+            logger.error(e)
+            return ORJSONResponse("ERROR", status_code=500)
 
-    except Exception as e:
+        rows = response.data
+        next_before = rows[-1]["id"] if len(rows) == limit else None
+        if "id" not in columns:
+            rows = [{k: v for k, v in row.items() if k != "id"} for row in rows]
+        body = dumps({"items": rows, "next_before": next_before})
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        cached = _insights_cache[cache_key] = (etag, body)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.post("/insights/")
+async def post_insights(session: DbDep, current_user: CurrentUser):
+    """
+    Regenerates the dashboard insights and returns the stored rows. Several
+    model calls per refresh, so only logged-in users may start one, each against
+    their own daily budget.
+    """
+    subject = current_user.username
+    # The generations run in parallel, each is held to its share of the budget
+    limits = await usage_governor.limits(
+        subject, "insights", runs=agent_settings.INSIGHT_COUNT
+    )
+    usage = RunUsage()
+    try:
+        rows = await refresh_insights(session, usage=usage, usage_limits=limits)
+    except InsightGenerationError as e:
         logger.error(e)
-        return JSONResponse("ERROR", status_code=500)
+        raise HTTPException(status_code=503, detail="Insights could not be generated")
+    finally:
+        await usage_governor.record(subject, "insights", usage)
+    _insights_cache.clear()
+    return ORJSONResponse(rows, status_code=201)
+
+
+@router.get("/usage/")
+async def get_usage(_admin: AdminUser, day: date | None = None):
+    """Agent requests, tool calls and tokens of a day, per endpoint and per user."""
+    return await usage_governor.metrics(day)
+
+
+@router.get("/chat/{conversation_id}")
+async def get_chat_history(
+    conversation_id: uuid.UUID,
+    session: DbDep,
+    current_user: CurrentUser,
+    before: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = agent_settings.CHAT_HISTORY_PAGE_SIZE,
+):
+    """
+    The user's stored runs of a conversation, newest first. Pass next_before to
+    page back.
+    """
+    runs = await fetch_runs(
+        session, current_user.username, conversation_id, limit, before
+    )
+    next_before = runs[-1]["id"] if len(runs) == limit else None
+    return {"runs": runs, "next_before": next_before}
+
+
+async def emit_agent_events(stream: EventStream, events) -> None:
+    """Turns pydantic-ai stream events into delta and tool-call SSE events."""
+    async for event in events:
+        if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+            if event.part.content:
+                await stream.emit("delta", {"text": event.part.content})
+        elif isinstance(event, PartDeltaEvent) and isinstance(
+            event.delta, TextPartDelta
+        ):
+            await stream.emit("delta", {"text": event.delta.content_delta})
+        elif isinstance(event, FunctionToolCallEvent):
+            await stream.emit(
+                "tool-call",
+                {
+                    "tool_name": event.part.tool_name,
+                    "tool_call_id": event.part.tool_call_id,
+                    "args": event.part.args_as_dict(),
+                },
+            )
 
 
 @router.post("/chat/")
-async def post_chat(payload: ChatPrompt) -> StreamingResponse:
-    async def stream_messages():
-        """Streams new line delimited JSON `Message`s to the client."""
-        # stream the user prompt so that can be displayed straight away
-
-        # get the chat history so far to pass as context to the agent
-        # messages = await database.get_messages()
-        # run the agent with the user prompt and the chat history
-        texts = []
-        async with agent.run_stream(payload.prompt) as result:
-            async for text in result.stream_text(debounce_by=0.01, delta=True):
-                texts.append(text)
-                yield text
-
-        text = "".join(texts)
-        print("FINAL TEXT", text)
-
-        # add new messages (e.g. the user prompt and the agent response in this case) to the database
-        # await database.add_messages(result.new_messages_json())
-
-    return StreamingResponse(stream_messages(), media_type="text/event-stream")
+async def post_chat(
+    payload: ChatPrompt, session: DbDep, current_user: CurrentUser
+) -> StreamingResponse:
+    # Conversations belong to a user, and so does the budget they spend
+    subject = current_user.username
+    conversation_id = payload.conversation_id or uuid.uuid4()
+    # Only a first prompt can reuse an answer, later ones depend on the history
+    cacheable = payload.cache and not payload.conversation_id
+    cached = await chat_cache.lookup(payload.prompt) if cacheable else None
+    # Refuse before streaming starts when the daily budget is spent
+    limits = None if cached else await usage_governor.limits(subject, "chat")
+    usage = RunUsage()
+    history = (
+        await load_history(session, subject, conversation_id)
+        if payload.conversation_id
+        else []
+    )
+    stream = EventStream()
+
+    async def serve_cached():
+        messages = ModelMessagesTypeAdapter.validate_python(cached["messages"])
+        await save_run(session, subject, conversation_id, messages)
+        await stream.emit("delta", {"text": cached["text"]})
+        await stream.emit(
+            "usage",
+            {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cached": True},
+        )
+        await stream.emit("done", {"conversation_id": str(conversation_id)})
+
+    async def handle_events(_ctx, events):
+        await emit_agent_events(stream, events)
+
+    async def run_agent():
+        try:
+            result = await agent.run(
+                payload.prompt,
+                message_history=history,
+                event_stream_handler=handle_events,
+                usage=usage,
+                usage_limits=limits,
+            )
+            # the user prompt and the agent response become context for the next prompt
+            await save_run(session, subject, conversation_id, result.new_messages())
+            if cacheable:
+                tools = {
+                    part.tool_name
+                    for message in result.new_messages()
+                    for part in message.parts
+                    if isinstance(part, ToolCallPart)
+                }
+                await chat_cache.store(
+                    payload.prompt,
+                    result.output,
+                    ModelMessagesTypeAdapter.dump_python(
+                        result.new_messages(), mode="json"
+                    ),
+                    tools,
+                )
+            await stream.emit(
+                "usage",
+                {
+                    "requests": usage.requests,
+                    "input_tokens": usage.input_tokens,
+                    "output_tokens": usage.output_tokens,
+                },
+            )
+            await stream.emit("done", {"conversation_id": str(conversation_id)})
+        except asyncio.CancelledError:
+            await stream.emit("cancelled", {})
+            raise
+        except UsageLimitExceeded as e:
+            logger.warning(f"Chat run for {subject} stopped: {e}")
+            await stream.emit("error", {"detail": "The question needed too much work"})
+        except Exception as e:
+            logger.exception(f"Chat run failed: {e}")
+            await stream.emit("error", {"detail": "The agent failed to answer"})
+        finally:
+            await usage_governor.record(subject, "chat", usage)
+
+    async def event_source():
+        task = asyncio.create_task(
+            stream.produce(serve_cached() if cached else run_agent())
+        )
+        try:
+            async for chunk in stream.listen():
+                yield chunk
+        finally:
+            # Starlette stops this generator when the client disconnects. The
+            # run goes on for a grace period so the client can resume it, then
+            # is cancelled so an abandoned chat does not keep spending tokens
+            stream.detach(task)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={
+            "X-Conversation-Id": str(conversation_id),
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/chat/events/{stream_id}")
+async def resume_chat(
+    stream_id: str,
+    last_event_id: Annotated[str | None, Header()] = None,
+) -> StreamingResponse:
+    """
+    Replays a chat stream after Last-Event-ID and follows it until it ends, for
+    clients that lost the connection of POST /chat/.
+    """
+    last_seq = 0
+    if last_event_id:
+        try:
+            last_stream, last_seq = parse_event_id(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Malformed Last-Event-ID")
+        if last_stream != stream_id:
+            raise HTTPException(
+                status_code=400, detail="Event id is for another stream"
+            )
+
+    return StreamingResponse(
+        replay(stream_id, last_seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -43,15 +43,34 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     LDAP_BASE: str = "DC=corp,DC=riotinto,DC=org"
     LDAP_SERVER_URI: str = "ldap://10.45.251.21"
+    # Optional service account for user searches; without it the user's own bind is used
+    LDAP_SERVICE_USER: str | None = None
+    LDAP_SERVICE_PASSWORD: str | None = None
+    LDAP_TIMEOUT_SECONDS: int = 5
+    LDAP_MAX_CONCURRENT_BINDS: int = 8
+    # Service-account connections shared by the user searches of concurrent logins
+    LDAP_SEARCH_POOL_SIZE: int = 4
+    LDAP_USER_CACHE_SIZE: int = 1024
+    LDAP_USER_CACHE_SECONDS: int = 60 * 10
 
     LDAP_ALLOWED_GROUP: Annotated[list[str] | str, BeforeValidator(parse_env_list)] = [
         "CN=OT_FileShare_T&IP_UG Geosciences_Geotechnical_RO,OU=OT PowerScale,OU=Folder Permissions,OU=Rights,OU=MN-Oyu_Tolgoi,OU=APAC,OU=PROD,DC=corp,DC=riotinto,DC=org",
         "CN=OT_FileShare_T&IP_UG Geosciences_Geotechnical_RW,OU=OT PowerScale,OU=Folder Permissions,OU=Rights,OU=MN-Oyu_Tolgoi,OU=APAC,OU=PROD,DC=corp,DC=riotinto,DC=org",
     ]
 
-    # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Clients renew the access token through POST /login/refresh before it runs
+    # out; a stolen one is only good for this long
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    # 60 minutes * 24 hours * 8 days = 8 days, rotated on every refresh
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     TOKEN_KEY: str = "access_token"
+    REFRESH_TOKEN_KEY: str = "refresh_token"
+    AUTH_TOKEN_CACHE_SIZE: int = 4096
+    # Revoked sessions are mirrored into a per-worker Bloom filter at this interval
+    AUTH_REVOCATION_SYNC_SECONDS: int = 5
+    AUTH_REVOCATION_CAPACITY: int = 10000
+    # LDAP usernames allowed on admin routes such as /profiles
+    ADMIN_USERS: Annotated[list[str] | str, BeforeValidator(parse_env_list)] = []
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -129,8 +148,61 @@ class Settings(BaseSettings):
     UAT_MONITORED_DP_DATA: str = "/app/static/csv/dp_data"
     UAT_MONITORED_FRAGMENTATION: str = "/app/static/csv/fragmentation"
     UAT_WATER_MONITORING: str = "/app/static/csv/water_monitoring"
+    COLUMNAR_EXPORT_DIR: str = "/app/static/parquet/fragmentation"
     SUBSCRIBED_CHANNEL: str = "JOB_CHANNEL"
 
+    # Drawpoint hierarchy mirrored from CaveCAD into the app database
+    CAVECAD_PANEL: str = "0"
+    CAVECAD_AREA: str = "EXL"
+    CAVECAD_SYNC_INTERVAL_SECONDS: int = 60 * 30
+    CAVECAD_TIMEOUT_SECONDS: float = 10.0
+
+    # Background jobs (app/worker.py)
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY_SECONDS: int = 10
+    JOB_TTL_SECONDS: int = 60 * 60 * 24
+    # Keep at or below JOB_TTL_SECONDS so a replayed key still finds its job
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+
+    # Daily agent budget per user (or per client IP when not logged in)
+    USAGE_DAILY_TOKEN_BUDGET: int = 500_000
+    USAGE_DAILY_REQUEST_BUDGET: int = 300
+
+    # Semantic cache for first chat prompts that opt in with "cache": true
+    CHAT_CACHE_SIMILARITY: float = 0.9
+    CHAT_CACHE_MAX_ENTRIES: int = 500
+    # Lifetime of a cached answer that used no tools; with tools the shortest
+    # tool TTL applies so answers never outlive the data they quote
+    CHAT_CACHE_TTL_SECONDS: int = 60 * 60
+
+    SSE_HEARTBEAT_SECONDS: int = 15
+    # How long a client can come back with Last-Event-ID and get missed events
+    SSE_REPLAY_TTL_SECONDS: int = 60 * 5
+    # How long a chat keeps running after its client disconnected, so that a
+    # reconnect can still get the answer; resumed clients extend it
+    SSE_DISCONNECT_GRACE_SECONDS: int = 30
+
+    # Request profiling (app/core/profiling.py), the middleware is only added when enabled
+    PROFILING_ENABLED: bool = False
+    # Share of requests profiled unasked, e.g. 0.01
+    PROFILING_SAMPLE_RATE: float = 0.0
+    # Requests sending PROFILING_TOKEN in this header are always profiled
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_TOKEN: str | None = None
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    # The newest profiles are kept, older ones are deleted
+    PROFILING_DIR: str = "/app/static/profiles"
+    PROFILING_MAX_PROFILES: int = 100
+
+    # OpenTelemetry tracing (app/core/tracing.py), exported over OTLP/HTTP
+    OTEL_ENABLED: bool = False
+    OTEL_SERVICE_NAME: str = "back-end-fragmentation"
+    OTEL_EXPORTER_OTLP_TRACES_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    # Share of traces kept; spans from a sampled parent are always kept
+    OTEL_SAMPLE_RATE: float = 1.0
+    # Record prompts, model output and tool arguments in agent spans
+    OTEL_AGENT_CONTENT: bool = False
+
     @computed_field
     @property
     def UAT_PATHS(self) -> dict[str, str]:
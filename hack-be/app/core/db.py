@@ -99,6 +99,18 @@ async def initialize_tables(db: ProductionPostgres):
                 updated_date TIMESTAMP WITHOUT TIME ZONE NULL
             );
         """,
+        "drawpoint_hierarchy": """
+            CREATE TABLE drawpoint_hierarchy (
+                drawpoint_name VARCHAR(255) NOT NULL,
+                project_id VARCHAR(255) NOT NULL,
+                panel VARCHAR(255) NOT NULL,
+                area VARCHAR(255) NOT NULL,
+                primary_heading VARCHAR(255),
+                secondary_heading VARCHAR(255),
+                synced_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                PRIMARY KEY (panel, area, drawpoint_name, project_id)
+            );
+        """,
     }
 
     for table_name, create_sql in tables_to_create.items():
@@ -1,11 +1,22 @@
+import asyncio
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from ldap3 import Server, Connection, ALL, SUBTREE
+from ldap3 import Server, Connection, RESTARTABLE, SUBTREE
 from ldap3.core.exceptions import LDAPBindError
+from ldap3.utils.conv import escape_filter_chars
+from cachetools import TTLCache
+from opentelemetry.trace import SpanKind
 
 from app.core.config import settings
+from app.core.tracing import tracer
 import json
 from typing import List, Any
-from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -26,61 +37,143 @@ class LDAPUSER:
     dn: str
 
 
+USER_ATTRIBUTES = [
+    "memberOf",
+    "displayName",
+    "mail",
+    "telephoneNumber",
+    "title",
+    "department",
+    "distinguishedName",
+    "whenCreated",
+    "mailNickname",
+]
+
+NOT_IN_ACCESS_GROUP = r"""You are not in the ACCESS GROUP, contact support or your supervisor to get access.
+                Check if you can visit following folder.---------------------------------------------
+                \\burd\Data\T&IP\UG Geosciences\Geotechnical\45.Cave Management\05. Cave Monitoring\16. Weekly Inspection Photo
+                """
+
+server = Server(
+    settings.LDAP_SERVER_URI,
+    get_info="NO_INFO",
+    connect_timeout=settings.LDAP_TIMEOUT_SECONDS,
+)
+
+# Binds block a thread for a network round trip; bound them so a login burst
+# neither starves the request threadpool nor floods the domain controller.
+_bind_executor = ThreadPoolExecutor(
+    max_workers=settings.LDAP_MAX_CONCURRENT_BINDS, thread_name_prefix="ldap"
+)
+
+# username -> LDAP entry (as entry_to_json), group membership included
+_user_cache: TTLCache = TTLCache(
+    maxsize=settings.LDAP_USER_CACHE_SIZE, ttl=settings.LDAP_USER_CACHE_SECONDS
+)
+_cache_lock = threading.Lock()
+
+# Idle service-account search connections; each is used by one login at a time
+_search_pool: queue.LifoQueue[Connection] = queue.LifoQueue()
+_search_slots = threading.BoundedSemaphore(settings.LDAP_SEARCH_POOL_SIZE)
+
+
+@contextmanager
+def _service_connection():
+    """
+    A search connection bound as the service account, taken from a pool of at
+    most LDAP_SEARCH_POOL_SIZE. A connection that fails is unbound and dropped,
+    so the next search opens a fresh one.
+    """
+    with _search_slots:
+        try:
+            conn = _search_pool.get_nowait()
+        except queue.Empty:
+            conn = Connection(
+                server,
+                user=settings.LDAP_SERVICE_USER,
+                password=settings.LDAP_SERVICE_PASSWORD,
+                client_strategy=RESTARTABLE,
+                receive_timeout=settings.LDAP_TIMEOUT_SECONDS,
+                auto_bind=True,
+            )
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.unbind()
+            except Exception:
+                pass
+            raise
+        _search_pool.put(conn)
+
+
+def _search_user(conn: Connection, username: str) -> dict | None:
+    conn.search(
+        search_base=settings.LDAP_BASE,
+        search_filter=f"(sAMAccountName={escape_filter_chars(username)})",
+        search_scope=SUBTREE,
+        attributes=USER_ATTRIBUTES,
+    )
+    # Normally, with (sAMAccountName={username}), only one user should match.
+    if not conn.entries:
+        return None
+    return json.loads(conn.entries[0].entry_to_json())
+
+
+def _lookup_user(user_conn: Connection, username: str) -> dict | None:
+    """
+    Returns the user's entry from the cache, or searches for it. Searches go
+    through a pooled service connection when one is configured, otherwise
+    through the user's own connection.
+    """
+    with _cache_lock:
+        user = _user_cache.get(username)
+    if user is not None:
+        return user
+
+    if settings.LDAP_SERVICE_USER:
+        try:
+            with _service_connection() as conn:
+                user = _search_user(conn, username)
+        except Exception as e:
+            logger.warning(f"LDAP service connection error, searching as user: {e}")
+            user = _search_user(user_conn, username)
+    else:
+        user = _search_user(user_conn, username)
+
+    if user is not None:
+        with _cache_lock:
+            _user_cache[username] = user
+    return user
+
+
 def authenticate_ldap(username, password):
     user_dn = rf"CORP\{username}"
     try:
-        server = Server(settings.LDAP_SERVER_URI, get_info="NO_INFO")
-        conn = Connection(server, user=user_dn, password=password, auto_bind=True)
-        print(f"[+] Authentication successful for {username}")
-        search_filter = f"(sAMAccountName={username})"
-        conn.search(
-            search_base=settings.LDAP_BASE,
-            search_filter=search_filter,
-            search_scope=SUBTREE,
-            attributes=[
-                "memberOf",
-                "displayName",
-                "mail",
-                "telephoneNumber",
-                "title",
-                "department",
-                "distinguishedName",
-                "whenCreated",
-                "mailNickname",
-            ],
+        # The password is always verified by a bind, only the lookup is cached
+        conn = Connection(
+            server,
+            user=user_dn,
+            password=password,
+            receive_timeout=settings.LDAP_TIMEOUT_SECONDS,
+            auto_bind=True,
         )
-        user_entry = None
+        print(f"[+] Authentication successful for {username}")
+        try:
+            user = _lookup_user(conn, username)
+        finally:
+            conn.unbind()
 
-        if not conn.entries:
+        if user is None:
             print("[-] User found, but no groups or info listed.")
-            conn.unbind()
             return None, "User found, but no groups or info listed."
-        else:
-            # conn.entries can contain multiple entries if the search filter matches more than one user.
-            # Normally, with (sAMAccountName={username}), only one user should match.
-            # If there are multiple entries, they could be duplicate users or unexpected results.
-            user_entry = conn.entries[0]
-
-            groups = user_entry.memberOf.values if "memberOf" in user_entry else []
-            # & gives the common elements between both sets, if its empty no intersection thus DAT USER AINT ALLOWED TO visit ZE WEB
 
-            print(set(settings.LDAP_ALLOWED_GROUP) & set(groups))
-            if not set(settings.LDAP_ALLOWED_GROUP) & set(groups):
-                user_entry = None
+        # & gives the common elements between both sets, if its empty no intersection thus DAT USER AINT ALLOWED TO visit ZE WEB
+        groups = user["attributes"].get("memberOf", [])
+        if not set(settings.LDAP_ALLOWED_GROUP) & set(groups):
+            return None, NOT_IN_ACCESS_GROUP
 
-        conn.unbind()
-        # Convert LDAP entry to a dictionary
-        return (
-            (json.loads(user_entry.entry_to_json()), "Success")
-            if user_entry
-            else (
-                None,
-                r"""You are not in the ACCESS GROUP, contact support or your supervisor to get access.
-                Check if you can visit following folder.---------------------------------------------
-                \\burd\Data\T&IP\UG Geosciences\Geotechnical\45.Cave Management\05. Cave Monitoring\16. Weekly Inspection Photo
-                """,
-            )
-        )
+        return user, "Success"
 
     except LDAPBindError:
         print(f"[!] Authentication failed for {username}. Wrong credentials?")
@@ -91,3 +184,20 @@ def authenticate_ldap(username, password):
     except Exception as e:
         print(f"[!] LDAP error: {e}")
         return None, "LDAP error, (catostrophic failure.)"
+
+
+async def authenticate_ldap_async(username, password):
+    """authenticate_ldap on the bounded LDAP executor."""
+    loop = asyncio.get_running_loop()
+    # Measured here, so time spent waiting for a free executor thread counts too
+    with tracer.start_as_current_span(
+        "ldap bind",
+        kind=SpanKind.CLIENT,
+        attributes={"server.address": server.host, "enduser.id": username},
+    ) as span:
+        user, message = await loop.run_in_executor(
+            _bind_executor, authenticate_ldap, username, password
+        )
+        if user is None:
+            span.set_attribute("ldap.result", message)
+        return user, message
@@ -2,12 +2,15 @@ import asyncio
 import logging
 from typing import Any, Dict, List, Optional
 from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
 
 import asyncpg
 from asyncpg import Pool
 from asyncpg.exceptions import PostgresError
+from opentelemetry.trace import SpanKind
 
 from app.core.config import settings
+from app.core.tracing import tracer
 import functools
 
 logger = logging.getLogger(__name__)
@@ -20,6 +23,15 @@ class ProductionPostgres:
         self._connection_retries = 3
         self._retry_delay = 1.0
 
+        url = urlsplit(database_url)
+        self._database = url.path.lstrip("/")
+        self._span_attributes = {
+            "db.system": "postgresql",
+            "db.namespace": self._database,
+            "server.address": url.hostname or "",
+            "server.port": url.port or 5432,
+        }
+
     async def connect(self):
         """Create connection pool with production-ready settings"""
         if self.pool is not None:
@@ -96,35 +108,65 @@ class ProductionPostgres:
             if connection:
                 await self.pool.release(connection)
 
+    def _span(self, query: str):
+        """Client span around one statement, pool wait included."""
+        operation = query.split(None, 1)[0].upper() if query.strip() else "QUERY"
+        return tracer.start_as_current_span(
+            f"{operation} {self._database}".rstrip(),
+            kind=SpanKind.CLIENT,
+            attributes={
+                **self._span_attributes,
+                "db.operation.name": operation,
+                "db.query.text": query,
+            },
+        )
+
     async def execute_query(self, query: str, *args) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results"""
-        async with self.get_connection() as conn:
-            try:
-                rows = await conn.fetch(query, *args)
-                return [dict(row) for row in rows]
-            except PostgresError as e:
-                logger.error(f"Query execution failed: {query[:100]}... Error: {e}")
-                raise
+        with self._span(query):
+            async with self.get_connection() as conn:
+                try:
+                    rows = await conn.fetch(query, *args)
+                    return [dict(row) for row in rows]
+                except PostgresError as e:
+                    logger.error(f"Query execution failed: {query[:100]}... Error: {e}")
+                    raise
 
     async def execute_one(self, query: str, *args) -> Optional[Dict[str, Any]]:
         """Execute a SELECT query and return single result"""
-        async with self.get_connection() as conn:
-            try:
-                row = await conn.fetchrow(query, *args)
-                return dict(row) if row else None
-            except PostgresError as e:
-                logger.error(f"Query execution failed: {query[:100]}... Error: {e}")
-                raise
+        with self._span(query):
+            async with self.get_connection() as conn:
+                try:
+                    row = await conn.fetchrow(query, *args)
+                    return dict(row) if row else None
+                except PostgresError as e:
+                    logger.error(f"Query execution failed: {query[:100]}... Error: {e}")
+                    raise
 
     async def execute_command(self, query: str, *args) -> str:
         """Execute INSERT/UPDATE/DELETE and return status"""
-        async with self.get_connection() as conn:
-            try:
-                result = await conn.execute(query, *args)
-                return result
-            except PostgresError as e:
-                logger.error(f"Command execution failed: {query[:100]}... Error: {e}")
-                raise
+        with self._span(query):
+            async with self.get_connection() as conn:
+                try:
+                    result = await conn.execute(query, *args)
+                    return result
+                except PostgresError as e:
+                    logger.error(
+                        f"Command execution failed: {query[:100]}... Error: {e}"
+                    )
+                    raise
+
+    async def execute_many(self, query: str, args: List[tuple]) -> None:
+        """Execute a command for every argument tuple in one round trip"""
+        with self._span(query):
+            async with self.get_connection() as conn:
+                try:
+                    await conn.executemany(query, args)
+                except PostgresError as e:
+                    logger.error(
+                        f"Command execution failed: {query[:100]}... Error: {e}"
+                    )
+                    raise
 
     async def health_check(self) -> bool:
         """Check if database connection is healthy"""
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import time
+import uuid
+from datetime import datetime
+
+from pyinstrument import Profiler
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}$")
+
+
+class ProfileStore:
+    """
+    The newest request profiles on disk: an HTML flame graph and a JSON summary
+    per request. Ids start with the time, so sorting them sorts by age and
+    saving a profile deletes the oldest ones beyond max_profiles.
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def _ids(self) -> list[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def save(self, summary: dict, profiler: Profiler) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = summary["id"]
+        with open(self._path(profile_id, "html"), "w") as f:
+            f.write(profiler.output_html())
+        # The summary goes last, a profile is listed only once its HTML exists
+        with open(self._path(profile_id, "json"), "w") as f:
+            json.dump(summary, f)
+
+        ids = self._ids()
+        for old_id in ids[: max(len(ids) - self.max_profiles, 0)]:
+            for extension in ("json", "html"):
+                try:
+                    os.remove(self._path(old_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def summaries(self) -> list[dict]:
+        """Summaries of the stored profiles, newest first."""
+        summaries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, "json")) as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                # Pruned or half written while listing
+                continue
+        return summaries
+
+    def html_path(self, profile_id: str) -> str | None:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, "html")
+        return path if os.path.exists(path) else None
+
+
+profiles = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles HTTP requests that send PROFILING_TOKEN in PROFILING_HEADER, plus
+    a PROFILING_SAMPLE_RATE share of the rest, and answers them with an
+    X-Profile-Id header. One request per worker is profiled at a time and the
+    others pass straight through, so when nothing is profiled the cost is a
+    header lookup and a random draw.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore = profiles):
+        self.app = app
+        self.store = store
+        self.busy = False
+
+    def trigger(self, scope: Scope) -> str | None:
+        if settings.PROFILING_TOKEN:
+            token = Headers(scope=scope).get(settings.PROFILING_HEADER)
+            if token and secrets.compare_digest(token, settings.PROFILING_TOKEN):
+                return "header"
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = None
+        if scope["type"] == "http" and not self.busy:
+            trigger = self.trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        self.busy = True
+        started = datetime.now()
+        profile_id = f"{started:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        # async_mode follows this request's task only, not the other requests
+        # running on the event loop meanwhile
+        profiler = Profiler(
+            interval=settings.PROFILING_INTERVAL_SECONDS, async_mode="enabled"
+        )
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - start
+            self.busy = False
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 1),
+                "started": started.isoformat(),
+                "trigger": trigger,
+            }
+            try:
+                # Rendering the flame graph takes a while, keep it off the loop
+                await asyncio.to_thread(self.store.save, summary, profiler)
+            except Exception as e:
+                logger.error(f"Failed to save profile {profile_id}: {e}")
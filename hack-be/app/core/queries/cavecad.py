@@ -59,3 +59,99 @@ class CavecadQueries:
             
                     ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
                     """
+
+
+class HierarchyQueries:
+    # Runs against the CaveCAD server; $1 = panel, $2 = area
+    source = """
+                SELECT DISTINCT
+                    dp.short_name   AS drawpoint_name,
+                    pr.name         AS project_id,
+                    pa.name         AS panel,
+                    ar.name         AS area,
+                    ph.name         AS primary_heading,
+                    sh.name         AS secondary_heading
+                FROM cavecad_ot.draw_points dp
+                JOIN cavecad_ot.secondaryheading sh
+                  ON sh.secondaryheadingid = dp.secondaryheadingid
+                JOIN cavecad_ot.primaryheadings ph
+                  ON ph.primaryheadingid = sh.primaryheadingid
+                JOIN cavecad_ot.area ar
+                  ON ar.areaid = ph.areaid
+                JOIN cavecad_ot.panel pa
+                  ON pa.panelid = ar.panelid
+                JOIN cavecad_ot.projects pr
+                  ON pr.project_id = pa.project_id
+                WHERE pa.name = $1
+                  AND ar.name = $2
+                ORDER BY drawpoint_name
+                """
+
+    # Same as source, restricted to the given drawpoints ($3 = text[])
+    source_for_drawpoints = """
+                SELECT DISTINCT
+                    dp.short_name   AS drawpoint_name,
+                    pr.name         AS project_id,
+                    pa.name         AS panel,
+                    ar.name         AS area,
+                    ph.name         AS primary_heading,
+                    sh.name         AS secondary_heading
+                FROM cavecad_ot.draw_points dp
+                JOIN cavecad_ot.secondaryheading sh
+                  ON sh.secondaryheadingid = dp.secondaryheadingid
+                JOIN cavecad_ot.primaryheadings ph
+                  ON ph.primaryheadingid = sh.primaryheadingid
+                JOIN cavecad_ot.area ar
+                  ON ar.areaid = ph.areaid
+                JOIN cavecad_ot.panel pa
+                  ON pa.panelid = ar.panelid
+                JOIN cavecad_ot.projects pr
+                  ON pr.project_id = pa.project_id
+                WHERE pa.name = $1
+                  AND ar.name = $2
+                  AND dp.short_name = ANY($3::text[])
+                ORDER BY drawpoint_name
+                """
+
+    # Only rows whose hierarchy actually changed are rewritten
+    upsert = """
+                INSERT INTO drawpoint_hierarchy (
+                    drawpoint_name,
+                    project_id,
+                    panel,
+                    area,
+                    primary_heading,
+                    secondary_heading,
+                    synced_date
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (panel, area, drawpoint_name, project_id) DO UPDATE
+                SET
+                    primary_heading = EXCLUDED.primary_heading,
+                    secondary_heading = EXCLUDED.secondary_heading,
+                    synced_date = EXCLUDED.synced_date
+                WHERE (drawpoint_hierarchy.primary_heading, drawpoint_hierarchy.secondary_heading)
+                    IS DISTINCT FROM (EXCLUDED.primary_heading, EXCLUDED.secondary_heading)
+                """
+
+    lookup = """
+                SELECT
+                    drawpoint_name,
+                    project_id,
+                    panel,
+                    area,
+                    primary_heading,
+                    secondary_heading
+                FROM drawpoint_hierarchy
+                WHERE panel = $1
+                  AND area = $2
+                  AND drawpoint_name = ANY($3::text[])
+                ORDER BY drawpoint_name
+                """
+
+    # Drawpoints that disappeared from CaveCAD; $3 = drawpoints still present
+    prune = """
+                DELETE FROM drawpoint_hierarchy
+                WHERE panel = $1
+                  AND area = $2
+                  AND NOT (drawpoint_name = ANY($3::text[]))
+                """
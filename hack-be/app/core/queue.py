@@ -0,0 +1,188 @@
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from opentelemetry.trace import SpanKind
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.core.tracing import inject, tracer
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Reliable Redis list queue. A worker moves a job id from the queue into its own
+    processing list, so jobs held by a crashed worker are put back when it restarts.
+    Job state lives in a hash per job and every state change is published on the
+    WebSocket channel. Every client gets those events, so they carry only the id
+    and status; the owner reads the rest through GET /cavecad/jobs/{job_id}.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queue_key = f"jobs:{name}:queue"
+        self.delayed_key = f"jobs:{name}:delayed"
+
+    def job_key(self, job_id: str) -> str:
+        return f"jobs:{self.name}:job:{job_id}"
+
+    def processing_key(self, worker: str) -> str:
+        return f"jobs:{self.name}:processing:{worker}"
+
+    def dedup_key(self, key: str) -> str:
+        return f"jobs:{self.name}:dedup:{key}"
+
+    async def enqueue(
+        self, payload: dict, job_id: str | None = None, owner: str = "", dedup: str = ""
+    ) -> str:
+        """
+        Queues payload; owner is who may read the job back, see get_job, and
+        dedup the enqueue_once key that points at the job, if any.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        redis = get_redis_client()
+        await redis.hset(
+            self.job_key(job_id),
+            mapping={
+                "status": "queued",
+                "payload": json.dumps(payload),
+                "attempts": 0,
+                "owner": owner,
+                "dedup": dedup,
+                "created_date": datetime.now().isoformat(),
+                # The worker continues the submitting request's trace
+                **inject({}),
+            },
+        )
+        await redis.expire(self.job_key(job_id), settings.JOB_TTL_SECONDS)
+        await redis.lpush(self.queue_key, job_id)
+        await self.publish(job_id, "queued")
+        return job_id
+
+    async def enqueue_once(
+        self, key: str, fingerprint: str, payload: dict, owner: str = ""
+    ) -> tuple[str, str | None]:
+        """
+        Enqueues the payload unless a job was already created under key within
+        IDEMPOTENCY_TTL_SECONDS and has not failed for good (see release). Returns
+        the job id and, for a duplicate, the fingerprint stored by the first
+        request (None when a new job was created).
+        """
+        job_id = uuid.uuid4().hex
+        claim = json.dumps({"job_id": job_id, "fingerprint": fingerprint})
+        # SET NX GET claims the key and returns an earlier claim in one round trip
+        existing = await get_redis_client().set(
+            self.dedup_key(key),
+            claim,
+            nx=True,
+            get=True,
+            ex=settings.IDEMPOTENCY_TTL_SECONDS,
+        )
+        if existing is not None:
+            existing = json.loads(existing)
+            return existing["job_id"], existing["fingerprint"]
+
+        try:
+            await self.enqueue(payload, job_id=job_id, owner=owner, dedup=key)
+        except BaseException:
+            # Otherwise retries would find the claim and report a job that never existed
+            await get_redis_client().delete(self.dedup_key(key))
+            raise
+        return job_id, None
+
+    async def release(self, job_id: str) -> None:
+        """
+        Drops the enqueue_once claim of a job that failed for good, so the same
+        submission can be sent again instead of replaying the failure.
+        """
+        redis = get_redis_client()
+        key = await redis.hget(self.job_key(job_id), "dedup")
+        if not key:
+            return
+        claim = await redis.get(self.dedup_key(key))
+        # A later submission may already hold the key
+        if claim is not None and json.loads(claim)["job_id"] == job_id:
+            await redis.delete(self.dedup_key(key))
+
+    async def get(self, job_id: str) -> dict | None:
+        job = await get_redis_client().hgetall(self.job_key(job_id))
+        if not job:
+            return None
+        for field in ("payload", "result"):
+            if field in job:
+                job[field] = json.loads(job[field])
+        for field in ("attempts", "progress", "total"):
+            if field in job:
+                job[field] = int(job[field])
+        return job
+
+    async def update(self, job_id: str, **fields) -> None:
+        await get_redis_client().hset(
+            self.job_key(job_id),
+            mapping={
+                key: value if isinstance(value, str | int) else json.dumps(value)
+                for key, value in fields.items()
+            },
+        )
+
+    async def publish(self, job_id: str, status: str) -> None:
+        """
+        Broadcasts a job's new status to every WebSocket client through Redis.
+        Results and errors stay in the job hash, out of other users' sight.
+        """
+        with tracer.start_as_current_span(
+            f"{settings.SUBSCRIBED_CHANNEL} publish",
+            kind=SpanKind.PRODUCER,
+            attributes={
+                "messaging.system": "redis",
+                "messaging.destination.name": settings.SUBSCRIBED_CHANNEL,
+                "job.id": job_id,
+                "job.status": status,
+            },
+        ):
+            message = {
+                "type": "job",
+                "queue": self.name,
+                "job_id": job_id,
+                "status": status,
+            }
+            await get_redis_client().publish(
+                settings.SUBSCRIBED_CHANNEL, json.dumps(inject(message))
+            )
+
+    async def reserve(self, worker: str, timeout: int = 1) -> str | None:
+        """Blocks up to timeout seconds for the next job and claims it for worker."""
+        return await get_redis_client().blmove(
+            self.queue_key, self.processing_key(worker), timeout, "RIGHT", "LEFT"
+        )
+
+    async def ack(self, worker: str, job_id: str) -> None:
+        await get_redis_client().lrem(self.processing_key(worker), 1, job_id)
+
+    async def retry_later(self, worker: str, job_id: str, delay: float) -> None:
+        redis = get_redis_client()
+        await redis.zadd(self.delayed_key, {job_id: time.time() + delay})
+        await self.ack(worker, job_id)
+
+    async def promote_delayed(self) -> None:
+        """Moves delayed jobs whose retry time has come back onto the queue."""
+        redis = get_redis_client()
+        for job_id in await redis.zrangebyscore(self.delayed_key, 0, time.time()):
+            # Only the worker whose ZREM succeeds requeues the job
+            if await redis.zrem(self.delayed_key, job_id):
+                await redis.lpush(self.queue_key, job_id)
+
+    async def recover(self, worker: str) -> None:
+        """Requeues jobs a previous run of this worker claimed but never finished."""
+        redis = get_redis_client()
+        while await redis.lmove(
+            self.processing_key(worker), self.queue_key, "RIGHT", "RIGHT"
+        ):
+            pass
+
+
+export_queue = JobQueue("cavecad_export")
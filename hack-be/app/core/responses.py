@@ -0,0 +1,32 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.encoders import decimal_encoder
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """The types orjson leaves to the caller, encoded like jsonable_encoder does."""
+    if isinstance(value, Decimal):
+        return decimal_encoder(value)
+    if isinstance(value, set | frozenset):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    orjson encoding: datetime, date, UUID, dataclasses and numpy values are
+    encoded natively, without a pass through jsonable_encoder first.
+    """
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class ORJSONResponse(BaseORJSONResponse):
+    """The default response class of the app, see app.main."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import time
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    Revoked session ids. Redis holds them in a sorted set scored by the time the
+    revocation can be forgotten, i.e. when the last access token of the session
+    has expired. Every worker mirrors the set into a Bloom filter, so checking a
+    live session costs no network hop; only a filter hit is confirmed in Redis.
+    """
+
+    key = "auth:revoked_sessions"
+
+    def __init__(self, capacity: int, interval: int):
+        self.capacity = capacity
+        self.interval = interval
+        self.bloom = BloomFilter(capacity)
+        self.sync_task = None
+
+    async def revoke(self, session_id: str, until: float) -> None:
+        await get_redis_client().zadd(self.key, {session_id: until})
+        self.bloom.add(session_id)
+
+    async def is_revoked(self, session_id: str) -> bool:
+        if not self.bloom.might_contain(session_id):
+            return False
+        until = await get_redis_client().zscore(self.key, session_id)
+        return until is not None and until > time.time()
+
+    async def sync(self) -> None:
+        """Drops expired revocations and rebuilds the filter from Redis."""
+        redis = get_redis_client()
+        now = time.time()
+        await redis.zremrangebyscore(self.key, "-inf", now)
+        revoked = await redis.zrangebyscore(self.key, now, "+inf")
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(revoked)))
+        for session_id in revoked:
+            bloom.add(session_id)
+        self.bloom = bloom
+
+    async def run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Revocation list sync failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self.sync_task is None or self.sync_task.done():
+            self.sync_task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.sync_task and not self.sync_task.done():
+            self.sync_task.cancel()
+            try:
+                await self.sync_task
+            except asyncio.CancelledError:
+                pass
+
+
+revocations = RevocationList(
+    settings.AUTH_REVOCATION_CAPACITY, settings.AUTH_REVOCATION_SYNC_SECONDS
+)
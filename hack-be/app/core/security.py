@@ -1,10 +1,25 @@
+import hashlib
+import json
+import logging
+import secrets
+import time
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import jwt
+from cachetools import TLRUCache
+from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
+from redis.exceptions import RedisError
 
 from app.core.config import settings
+from app.core.redis import get_redis_client
+from app.core.revocation import revocations
+from app.models import LDAPUser
+
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -12,16 +27,175 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: dict | Any, expires_delta: timedelta) -> str:
+@dataclass
+class VerifiedToken:
+    signing_input: str
+    user: LDAPUser
+    session_id: str
+    exp: float
+
+
+# Keyed by signature; an entry lives until the token's own exp
+_verified_tokens: TLRUCache = TLRUCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttu=lambda _key, value, _now: value.exp,
+    timer=time.time,
+)
+
+
+def create_access_token(
+    subject: dict | Any, expires_delta: timedelta, session_id: str | None = None
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode = {
         "sub": subject,
         "exp": expire,
     }
+    if session_id:
+        to_encode["sid"] = session_id
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def _refresh_key(refresh_token: str) -> str:
+    return f"auth:refresh:{hashlib.sha256(refresh_token.encode()).hexdigest()}"
+
+
+def _used_refresh_key(refresh_token: str) -> str:
+    return f"auth:refresh_used:{hashlib.sha256(refresh_token.encode()).hexdigest()}"
+
+
+def _session_key(session_id: str) -> str:
+    return f"auth:session:{session_id}"
+
+
+def _token_session_id(payload: dict, signature: str) -> str:
+    """
+    The session of a token. Tokens issued before sessions existed have no sid;
+    they stay valid until they expire and are revoked on their own, by signature.
+    """
+    if "sid" in payload:
+        return payload["sid"]
+    return f"legacy:{hashlib.sha256(signature.encode()).hexdigest()}"
+
+
+async def _issue_tokens(session_id: str, user: LDAPUser) -> tuple[str, str]:
+    """Returns a new (access token, refresh token) pair for the session."""
+    refresh_token = secrets.token_urlsafe(32)
+    ttl = settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+    redis = get_redis_client()
+    await redis.set(
+        _refresh_key(refresh_token),
+        json.dumps({"sid": session_id, "user": user.model_dump()}),
+        ex=ttl,
+    )
+    await redis.set(_session_key(session_id), 1, ex=ttl)
+
+    access_token = create_access_token(
+        user.model_dump(),
+        timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        session_id=session_id,
+    )
+    return access_token, refresh_token
+
+
+async def create_session(user: LDAPUser) -> tuple[str, str]:
+    return await _issue_tokens(uuid.uuid4().hex, user)
+
+
+async def rotate_refresh_token(
+    refresh_token: str,
+) -> tuple[LDAPUser, str, str] | None:
+    """
+    Exchanges a refresh token for a new access/refresh pair. Each refresh token
+    works once; presenting an already rotated one revokes its whole session,
+    since only a copied token can be replayed.
+    """
+    redis = get_redis_client()
+    stored = await redis.getdel(_refresh_key(refresh_token))
+    if stored is None:
+        reused_session = await redis.get(_used_refresh_key(refresh_token))
+        if reused_session:
+            await revoke_session(reused_session)
+        return None
+
+    stored = json.loads(stored)
+    session_id = stored["sid"]
+    if not await redis.exists(_session_key(session_id)):
+        return None
+
+    await redis.set(
+        _used_refresh_key(refresh_token),
+        session_id,
+        ex=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+    )
+    user = LDAPUser(**stored["user"])
+    access_token, new_refresh_token = await _issue_tokens(session_id, user)
+    return user, access_token, new_refresh_token
+
+
+async def revoke_session(session_id: str) -> None:
+    """Ends a session: its refresh tokens stop working and its access tokens are denied."""
+    await get_redis_client().delete(_session_key(session_id))
+    await revocations.revoke(
+        session_id, until=time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
+
+
+async def end_session(access_token: str | None, refresh_token: str | None) -> None:
+    """Revokes the session behind whichever of the two tokens identifies it."""
+    session_id = None
+    if access_token:
+        try:
+            payload = jwt.decode(
+                access_token,
+                settings.SECRET_KEY,
+                algorithms=[ALGORITHM],
+                options={"verify_exp": False},
+            )
+            session_id = _token_session_id(payload, access_token.rpartition(".")[2])
+        except InvalidTokenError:
+            pass
+    if session_id is None and refresh_token:
+        stored = await get_redis_client().get(_refresh_key(refresh_token))
+        if stored:
+            session_id = json.loads(stored)["sid"]
+    if session_id:
+        await revoke_session(session_id)
+
+
+async def get_token_user(token: str) -> LDAPUser:
+    """
+    Verifies the token and returns its user. A token seen before is served from
+    memory, and the revocation check is a local Bloom filter lookup, so the
+    common case needs no network hop.
+    """
+    signing_input, _, signature = token.rpartition(".")
+
+    cached = _verified_tokens.get(signature)
+    if cached is None or cached.signing_input != signing_input:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        cached = VerifiedToken(
+            signing_input=signing_input,
+            user=LDAPUser(**payload["sub"]),
+            session_id=_token_session_id(payload, signature),
+            exp=payload["exp"],
+        )
+        _verified_tokens[signature] = cached
+
+    try:
+        revoked = await revocations.is_revoked(cached.session_id)
+    except RedisError as e:
+        # Only a Bloom filter hit asks Redis, so failing closed turns away few
+        # requests, and a revoked session never gets through during an outage
+        logger.warning(f"Could not confirm revocation of {cached.session_id}: {e}")
+        raise InvalidTokenError("Session could not be verified") from e
+    if revoked:
+        _verified_tokens.pop(signature, None)
+        raise InvalidTokenError("Session has been revoked")
+    return cached.user
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections.abc import Awaitable
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+
+HEARTBEAT = ": ping\n\n"
+# Events after which nothing more is sent on a stream
+TERMINAL_EVENTS = {"done", "error", "cancelled"}
+POLL_SECONDS = 0.25
+
+logger = logging.getLogger(__name__)
+
+# Producers left running after their client disconnected, see EventStream.detach
+_detached: set[asyncio.Task] = set()
+
+
+def listener_key(stream_id: str) -> str:
+    """Kept alive by replay() while a resumed client follows the stream."""
+    return f"sse:{stream_id}:listener"
+
+
+def encode(message: dict) -> str:
+    data = json.dumps(message["data"])
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+
+def parse_event_id(event_id: str) -> tuple[str, int]:
+    """Splits a Last-Event-ID of the form <stream_id>:<seq>."""
+    stream_id, _, seq = event_id.rpartition(":")
+    return stream_id, int(seq)
+
+
+class EventStream:
+    """
+    Server-Sent Events for one producer. Every event is handed to the live
+    connection through a local queue and appended to a Redis list, so a client
+    that reconnects with Last-Event-ID, on any worker, can pick up what it missed.
+    """
+
+    def __init__(self, stream_id: str | None = None):
+        self.stream_id = stream_id or uuid.uuid4().hex
+        self.key = f"sse:{self.stream_id}"
+        self.seq = 0
+        self.queue: asyncio.Queue[dict] = asyncio.Queue()
+        self.finished = False
+
+    async def emit(self, event: str, data: dict) -> None:
+        self.finished = self.finished or event in TERMINAL_EVENTS
+        self.seq += 1
+        message = {"id": f"{self.stream_id}:{self.seq}", "event": event, "data": data}
+        self.queue.put_nowait(message)
+        async with get_redis_client().pipeline(transaction=False) as pipe:
+            pipe.rpush(self.key, json.dumps(message))
+            pipe.expire(self.key, settings.SSE_REPLAY_TTL_SECONDS)
+            await pipe.execute()
+
+    async def produce(self, producer: Awaitable) -> None:
+        """
+        Runs the producer and makes sure the stream ends: a producer that fails,
+        or returns without a terminal event, is closed with an error event, so
+        listeners never wait on heartbeats forever.
+        """
+        cancelled = False
+        try:
+            await producer
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            logger.exception(f"Producer of stream {self.stream_id} failed: {e}")
+        finally:
+            if not self.finished:
+                event = "cancelled" if cancelled else "error"
+                detail = (
+                    {} if cancelled else {"detail": "The answer could not be finished"}
+                )
+                try:
+                    await self.emit(event, detail)
+                except Exception as e:
+                    # The live listener already has it from the queue
+                    logger.error(
+                        f"Could not store {event} of stream {self.stream_id}: {e}"
+                    )
+
+    def detach(self, task: asyncio.Task) -> None:
+        """
+        Lets the producer outlive its disconnected client, so the client can come
+        back through replay(). It is cancelled once nobody has followed the
+        stream for SSE_DISCONNECT_GRACE_SECONDS.
+        """
+        if task.done():
+            return
+        watcher = asyncio.create_task(self._cancel_when_abandoned(task))
+        _detached.add(watcher)
+        watcher.add_done_callback(_detached.discard)
+
+    async def _cancel_when_abandoned(self, task: asyncio.Task) -> None:
+        redis = get_redis_client()
+        while not task.done():
+            await asyncio.wait({task}, timeout=settings.SSE_DISCONNECT_GRACE_SECONDS)
+            if task.done():
+                return
+            try:
+                followed = await redis.exists(listener_key(self.stream_id))
+            except Exception as e:
+                logger.error(f"Could not check listeners of {self.stream_id}: {e}")
+                followed = False
+            if not followed:
+                task.cancel()
+                return
+
+    async def listen(self):
+        """Yields encoded events as they are emitted, with heartbeats in between."""
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    self.queue.get(), settings.SSE_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            yield encode(message)
+            if message["event"] in TERMINAL_EVENTS:
+                return
+
+
+async def replay(stream_id: str, last_seq: int):
+    """
+    Yields the events of a stream after last_seq, then keeps following it from
+    Redis until a terminal event arrives or the stream stops growing.
+    """
+    redis = get_redis_client()
+    key = f"sse:{stream_id}"
+    loop = asyncio.get_running_loop()
+    last_event = last_write = loop.time()
+    last_touch = None
+    while True:
+        # Tells a detached producer that its stream is followed again
+        if last_touch is None or loop.time() - last_touch >= 1:
+            await redis.set(
+                listener_key(stream_id), 1, ex=settings.SSE_DISCONNECT_GRACE_SECONDS
+            )
+            last_touch = loop.time()
+        # List index n holds event n + 1, so the next unseen one is at last_seq
+        messages = await redis.lrange(key, last_seq, -1)
+        for raw in messages:
+            message = json.loads(raw)
+            last_seq += 1
+            yield encode(message)
+            if message["event"] in TERMINAL_EVENTS:
+                return
+        if messages:
+            last_event = last_write = loop.time()
+            continue
+
+        # An expired list, or a producer that went silent, ends the replay
+        if not await redis.exists(key):
+            return
+        if loop.time() - last_event > settings.SSE_REPLAY_TTL_SECONDS:
+            return
+        if loop.time() - last_write >= settings.SSE_HEARTBEAT_SECONDS:
+            yield HEARTBEAT
+            last_write = loop.time()
+        await asyncio.sleep(POLL_SECONDS)
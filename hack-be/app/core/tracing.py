@@ -0,0 +1,100 @@
+"""
+OpenTelemetry tracing, off unless OTEL_ENABLED. setup_tracing installs the
+OTLP exporter, instruments the FastAPI app and every pydantic-ai agent; the
+spans around Postgres, Redis, WebSocket fan-out, LDAP and the export job are
+made by the modules themselves through tracer, which costs nothing while no
+provider is installed.
+
+Trace context crosses Redis as a traceparent field (W3C Trace Context): on
+queued jobs, so a worker run joins the trace of the request that submitted
+it, and on published messages, so the WebSocket broadcast joins the trace of
+the publisher.
+"""
+
+import json
+import logging
+
+from fastapi import FastAPI
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from pydantic_ai import Agent
+from pydantic_ai.models.instrumented import InstrumentationSettings
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("app")
+
+_provider: TracerProvider | None = None
+
+
+def setup_tracing(app: FastAPI | None = None, component: str = "api") -> None:
+    global _provider
+    if not settings.OTEL_ENABLED or _provider is not None:
+        return
+
+    _provider = TracerProvider(
+        resource=Resource.create(
+            {
+                SERVICE_NAME: settings.OTEL_SERVICE_NAME,
+                "service.component": component,
+                "deployment.environment": settings.ENVIRONMENT,
+            }
+        ),
+        sampler=ParentBased(TraceIdRatioBased(settings.OTEL_SAMPLE_RATE)),
+    )
+    _provider.add_span_processor(
+        BatchSpanProcessor(
+            OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_TRACES_ENDPOINT)
+        )
+    )
+    trace.set_tracer_provider(_provider)
+
+    if app is not None:
+        # WebSocket connections would be one span for their whole lifetime
+        FastAPIInstrumentor.instrument_app(
+            app, tracer_provider=_provider, excluded_urls="/ws/$"
+        )
+    Agent.instrument_all(
+        InstrumentationSettings(
+            tracer_provider=_provider,
+            include_content=settings.OTEL_AGENT_CONTENT,
+        )
+    )
+    logger.info(f"Tracing to {settings.OTEL_EXPORTER_OTLP_TRACES_ENDPOINT}")
+
+
+def shutdown_tracing() -> None:
+    """Flushes the spans still waiting in the batch processor."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+def inject(carrier: dict) -> dict:
+    """Adds the current span's traceparent to carrier, when there is one."""
+    propagate.inject(carrier)
+    return carrier
+
+
+def extract(carrier: dict) -> Context:
+    return propagate.extract(carrier)
+
+
+def message_context(message: str) -> Context | None:
+    """The trace context of a published message, if it carries one."""
+    if _provider is None or "traceparent" not in message:
+        return None
+    try:
+        carrier = json.loads(message)
+    except ValueError:
+        return None
+    return extract(carrier) if isinstance(carrier, dict) else None
@@ -0,0 +1,106 @@
+import dataclasses
+import logging
+from datetime import date, datetime, timezone
+
+from fastapi import HTTPException
+from pydantic_ai import RunUsage, UsageLimits
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from src.usage_limits import AGENT_LIMITS
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("requests", "tool_calls", "input_tokens", "output_tokens")
+# Counters are kept a week for the metrics route, budgets only look at today
+RETENTION_SECONDS = 60 * 60 * 24 * 8
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _key(day: str, endpoint: str, subject: str) -> str:
+    return f"usage:{day}:{endpoint}:{subject}"
+
+
+def _total_key(day: str, subject: str) -> str:
+    return f"usage_total:{day}:{subject}"
+
+
+class UsageGovernor:
+    """
+    Per user and per endpoint agent budgets. Every governed run is added to
+    Redis hashes per day, endpoint and user, plus a daily total per user that
+    the budget check reads, so the budget holds across workers.
+    """
+
+    async def spent(self, subject: str) -> dict[str, int]:
+        """Today's usage of subject across all endpoints."""
+        spent = await get_redis_client().hgetall(_total_key(_today(), subject))
+        return {counter: int(spent.get(counter, 0)) for counter in COUNTERS}
+
+    async def limits(self, subject: str, endpoint: str, runs: int = 1) -> UsageLimits:
+        """
+        The per run limits of endpoint, tightened to what is left of the
+        subject's daily budget. runs concurrent runs each get an equal share of
+        it, so together they cannot overspend. Raises 429 once the budget is
+        used up.
+        """
+        spent = await self.spent(subject)
+        tokens_left = (
+            settings.USAGE_DAILY_TOKEN_BUDGET
+            - (spent["input_tokens"] + spent["output_tokens"])
+        ) // runs
+        requests_left = (
+            settings.USAGE_DAILY_REQUEST_BUDGET - spent["requests"]
+        ) // runs
+        if tokens_left <= 0 or requests_left <= 0:
+            raise HTTPException(status_code=429, detail="Daily AI usage budget spent")
+
+        limits = AGENT_LIMITS[endpoint]
+        return dataclasses.replace(
+            limits,
+            request_limit=min(limits.request_limit or requests_left, requests_left),
+            total_tokens_limit=min(
+                limits.total_tokens_limit or tokens_left, tokens_left
+            ),
+        )
+
+    async def record(self, subject: str, endpoint: str, usage: RunUsage) -> None:
+        """
+        Adds a run's usage to the counters. Pass the RunUsage given to Agent.run
+        and call this in a finally block, so failed and cancelled runs count too.
+        """
+        if not usage.requests:
+            return
+        day = _today()
+        try:
+            async with get_redis_client().pipeline(transaction=False) as pipe:
+                for key in (_key(day, endpoint, subject), _total_key(day, subject)):
+                    for counter in COUNTERS:
+                        pipe.hincrby(key, counter, getattr(usage, counter))
+                    pipe.expire(key, RETENTION_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Could not record agent usage: {e}")
+
+    async def metrics(self, day: date | None = None) -> dict:
+        """Usage of one day, per endpoint and per subject."""
+        day = (day or datetime.now(timezone.utc).date()).isoformat()
+        redis = get_redis_client()
+        endpoints: dict[str, dict] = {}
+        subjects: dict[str, dict] = {}
+        async for key in redis.scan_iter(match=_key(day, "*", "*")):
+            _, _, endpoint, subject = key.split(":", 3)
+            values = await redis.hgetall(key)
+            for totals in (
+                endpoints.setdefault(endpoint, dict.fromkeys(COUNTERS, 0)),
+                subjects.setdefault(subject, dict.fromkeys(COUNTERS, 0)),
+            ):
+                for counter, value in values.items():
+                    totals[counter] += int(value)
+        return {"day": day, "endpoints": endpoints, "subjects": subjects}
+
+
+usage_governor = UsageGovernor()
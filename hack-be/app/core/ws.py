@@ -4,8 +4,11 @@ import redis.asyncio as aioredis
 from fastapi import WebSocket
 from redis.asyncio.client import PubSub
 
+from opentelemetry.trace import SpanKind
+
 from app.core.redis import get_redis_client
 from app.core.config import settings
+from app.core.tracing import message_context, tracer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -72,8 +75,19 @@ class ConnectionManager:
             await connection.send_text(message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections.values():
-            await connection.send_text(message)
+        # Joins the publisher's trace when the message carries its traceparent
+        with tracer.start_as_current_span(
+            f"{self.channel} broadcast",
+            context=message_context(message),
+            kind=SpanKind.CONSUMER,
+            attributes={
+                "messaging.system": "redis",
+                "messaging.destination.name": self.channel,
+                "ws.connections": len(self.active_connections),
+            },
+        ):
+            for connection in self.active_connections.values():
+                await connection.send_text(message)
 
     async def start_listening(self):
         """Start the Redis listener task"""
@@ -11,8 +11,15 @@ from app.core.config import settings
 from app.core.db import initialize_tables
 from app.core.postgres import cavecad as cavecad_db
 from app.core.postgres import db_pg as database
+from app.core.profiling import ProfilingMiddleware
 from app.core.redis import pool, redis_manager
+from app.core.responses import ORJSONResponse
+from app.core.revocation import revocations
+from app.core.tracing import setup_tracing, shutdown_tracing
 from app.core.ws import websocket_conn_man
+from app.services.cavecad.hierarchy import hierarchy_sync
+from src import weather_service
+from src.db import connect_supabase
 
 logger = logging.getLogger(__name__)
 
@@ -30,18 +37,26 @@ async def lifespan(app: FastAPI):
     # Startup items
     logger.info("Starting Redis listener...")
     await websocket_conn_man.start_listening()
-    # await database.connect()
+    # The app database must be up before the hierarchy sync starts writing to it
+    await database.connect()
     # await redis_manager.init_pool()
     # await cavecad_db.connect()
-    # await initialize_tables(database)
+    await initialize_tables(database)
+    await hierarchy_sync.start()
+    await revocations.start()
+    await connect_supabase(app)
     yield
 
     # Shutdown works
     logger.info("Shutting down Redis listener...")
     await websocket_conn_man.stop_listening()
+    await hierarchy_sync.stop()
+    await revocations.stop()
+    await weather_service.close()
     # await pool.disconnect()
-    # await database.disconnect()
+    await database.disconnect()
     # await cavecad_db.disconnect()
+    shutdown_tracing()
 
     # Close the main Redis pool if needed
     if hasattr(app.state, "redis_pool"):
@@ -52,9 +67,15 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
+setup_tracing(app)
+
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Set all CORS enabled origins
 app.add_middleware(
     CORSMiddleware,
@@ -70,6 +91,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Conversation-Id", "X-Profile-Id"],
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
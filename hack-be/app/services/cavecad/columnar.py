@@ -0,0 +1,74 @@
+import logging
+import os
+import uuid
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+# One row per approved drawpoint observation, typed for analysis rather than for
+# the CaveCAD importer (no header rows, real timestamps and numbers).
+EXPORT_SCHEMA = pa.schema(
+    [
+        ("image_id", pa.int64()),
+        ("project_id", pa.string()),
+        ("panel", pa.string()),
+        ("area", pa.string()),
+        ("primary_heading", pa.string()),
+        ("secondary_heading", pa.string()),
+        ("drawpoint_name", pa.string()),
+        ("upload_time", pa.timestamp("us")),
+        ("fine_area", pa.int64()),
+        ("small_area", pa.int64()),
+        ("medium_area", pa.int64()),
+        ("large_area", pa.int64()),
+        ("oversized_area", pa.int64()),
+        ("bund", pa.string()),
+        ("condition", pa.string()),
+        ("wetness", pa.string()),
+        ("drawpointConditionComment", pa.string()),
+        ("fragmentationComment", pa.string()),
+        ("wetnessComment", pa.string()),
+        ("username", pa.string()),
+        ("exported_date", pa.timestamp("us")),
+    ]
+)
+
+
+def write_parquet_batch(records: list[dict], export_dir: str) -> str | None:
+    """
+    Writes one submitted batch as its own Parquet file under a date partition
+    (export_dir/date=YYYY-MM-DD/). Batches never rewrite earlier files, so the
+    directory can be read as a single dataset with hive partitioning.
+    """
+    if not records:
+        return None
+
+    exported_date = datetime.now()
+    table = pa.Table.from_pylist(
+        [
+            {
+                **{name: record.get(name) for name in EXPORT_SCHEMA.names},
+                "exported_date": exported_date,
+            }
+            for record in records
+        ],
+        schema=EXPORT_SCHEMA,
+    )
+
+    partition_dir = os.path.join(export_dir, f"date={exported_date:%Y-%m-%d}")
+    os.makedirs(partition_dir, exist_ok=True)
+    filename = f"{exported_date:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+    file_path = os.path.join(partition_dir, filename)
+
+    # Readers scanning the directory must never see a half-written file; dataset
+    # discovery skips names starting with "." and the rename is atomic
+    tmp_path = os.path.join(partition_dir, f".{filename}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, file_path)
+
+    logger.info(f"{filename} ({table.num_rows} rows) saved to {partition_dir}")
+    return file_path
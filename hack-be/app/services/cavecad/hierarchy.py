@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from datetime import datetime
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.postgres import cavecad, db_pg
+from app.core.queries.cavecad import HierarchyQueries
+
+logger = logging.getLogger(__name__)
+
+
+async def _fetch_from_cavecad(query: str, *args) -> list[dict]:
+    """
+    Runs a read query on the CaveCAD server. Uses the shared pool when it is up,
+    otherwise a one-off connection, both bounded by CAVECAD_TIMEOUT_SECONDS.
+    """
+    timeout = settings.CAVECAD_TIMEOUT_SECONDS
+    if cavecad.is_connected:
+        return await asyncio.wait_for(cavecad.execute_query(query, *args), timeout)
+
+    conn = await asyncpg.connect(str(settings.CAVECAD_URL), timeout=timeout)
+    try:
+        rows = await conn.fetch(query, *args, timeout=timeout)
+        return [dict(row) for row in rows]
+    finally:
+        await conn.close()
+
+
+async def store_hierarchy(rows: list[dict]) -> None:
+    """Upserts CaveCAD hierarchy rows into the local drawpoint_hierarchy table."""
+    synced_date = datetime.now()
+    await db_pg.execute_many(
+        HierarchyQueries.upsert,
+        [
+            (
+                row["drawpoint_name"],
+                row["project_id"],
+                row["panel"],
+                row["area"],
+                row["primary_heading"],
+                row["secondary_heading"],
+                synced_date,
+            )
+            for row in rows
+        ],
+    )
+
+
+async def sync_drawpoint_hierarchy(
+    panel: str = settings.CAVECAD_PANEL, area: str = settings.CAVECAD_AREA
+) -> int:
+    """
+    Mirrors every drawpoint of a panel/area from CaveCAD. Unchanged rows are left
+    untouched, drawpoints that no longer exist upstream are removed.
+    """
+    rows = await _fetch_from_cavecad(HierarchyQueries.source, panel, area)
+    if not rows:
+        # An empty answer is more likely an upstream problem than a wiped panel
+        logger.warning(f"CaveCAD returned no drawpoints for panel={panel} area={area}")
+        return 0
+
+    await store_hierarchy(rows)
+    await db_pg.execute_command(
+        HierarchyQueries.prune, panel, area, [row["drawpoint_name"] for row in rows]
+    )
+    return len(rows)
+
+
+async def get_drawpoint_hierarchy(
+    drawpoints: list[str],
+    panel: str = settings.CAVECAD_PANEL,
+    area: str = settings.CAVECAD_AREA,
+) -> list[dict]:
+    """
+    Looks the drawpoints up in the local mirror. Drawpoints the mirror does not
+    know yet are fetched from CaveCAD and stored; if CaveCAD is slow or down the
+    locally known rows are returned on their own.
+    """
+    unique_dpts = sorted(set(drawpoints))
+    rows: list[dict] = []
+    try:
+        rows = await db_pg.execute_query(
+            HierarchyQueries.lookup, panel, area, unique_dpts
+        )
+    except Exception as e:
+        logger.error(f"Local drawpoint hierarchy lookup failed: {e}")
+
+    found = {row["drawpoint_name"] for row in rows}
+    missing = [dp for dp in unique_dpts if dp not in found]
+    if not missing:
+        return rows
+
+    try:
+        fetched = await _fetch_from_cavecad(
+            HierarchyQueries.source_for_drawpoints, panel, area, missing
+        )
+    except Exception as e:
+        logger.error(f"CaveCAD lookup failed, using local hierarchy only: {e}")
+        return rows
+
+    if fetched:
+        try:
+            await store_hierarchy(fetched)
+        except Exception as e:
+            logger.error(f"Could not store fetched drawpoint hierarchy: {e}")
+        rows = sorted(rows + fetched, key=lambda row: row["drawpoint_name"])
+    return rows
+
+
+class HierarchySync:
+    """Background task that refreshes the local drawpoint hierarchy on a schedule."""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.sync_task = None
+
+    async def run(self):
+        while True:
+            # Nothing to sync into until the app database is connected
+            if not db_pg.is_connected:
+                logger.warning(
+                    "Drawpoint hierarchy sync skipped, the app database is not connected"
+                )
+            else:
+                try:
+                    count = await sync_drawpoint_hierarchy()
+                    logger.info(f"Drawpoint hierarchy synced ({count} drawpoints)")
+                except Exception as e:
+                    logger.error(f"Drawpoint hierarchy sync failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self.sync_task is None or self.sync_task.done():
+            self.sync_task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.sync_task and not self.sync_task.done():
+            self.sync_task.cancel()
+            try:
+                await self.sync_task
+            except asyncio.CancelledError:
+                pass
+
+
+hierarchy_sync = HierarchySync(settings.CAVECAD_SYNC_INTERVAL_SECONDS)
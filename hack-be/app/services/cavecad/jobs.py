@@ -0,0 +1,52 @@
+import logging
+
+from asyncer import asyncify
+
+from app.core.config import settings
+from app.core.queue import JobQueue
+from app.core.tracing import tracer
+from app.models import LDAPUser
+from app.services.cavecad.main import create_and_dump_csv, fetch_cavecad_data
+from app.services.cavecad.schema import CavecadSubmitElement
+from app.services.cavecad.submission import save_submitted_results
+
+logger = logging.getLogger(__name__)
+
+
+async def process_submission(queue: JobQueue, job_id: str, job: dict) -> list:
+    """
+    Saves a submitted batch and regenerates the CaveCAD exports. The save results
+    are stored on the job once written, so a retry after a failed export does not
+    write the batch again.
+    """
+    submission = CavecadSubmitElement.model_validate(job["payload"]["submission"])
+    current_user = LDAPUser.model_validate(job["payload"]["user"])
+    total = len(submission.data)
+
+    results = job.get("result")
+    if results is None:
+        with tracer.start_as_current_span(
+            "cavecad save", attributes={"cavecad.records": total}
+        ):
+            results = []
+            for index, each_record in enumerate(submission.data, start=1):
+                results.append(await save_submitted_results(each_record, current_user))
+                await queue.update(job_id, status="saving", progress=index, total=total)
+                await queue.publish(job_id, "saving")
+            await queue.update(job_id, result=results)
+
+    await queue.update(job_id, status="exporting", progress=total, total=total)
+    await queue.publish(job_id, "exporting")
+    with tracer.start_as_current_span(
+        "cavecad export", attributes={"cavecad.records": total}
+    ):
+        drawpoints = [record.drawpoint_name for record in submission.data]
+        cavecad_rows = await fetch_cavecad_data(drawpoints)
+        records = [
+            {**x.model_dump(), "username": current_user.username}
+            for x in submission.data
+        ]
+        await asyncify(create_and_dump_csv)(
+            records, cavecad_rows, settings.UAT_PATHS, settings.COLUMNAR_EXPORT_DIR
+        )
+    return results
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import math
+import re
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.redis import get_redis_client
+from src.tool_cache import DEFAULT_TTL, TOOL_TTLS
+
+DIMENSIONS = 2**18
+TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+STOPWORDS = {
+    "a", "an", "and", "are", "be", "can", "could", "do", "for", "how", "i",
+    "is", "it", "me", "of", "our", "please", "should", "so", "the", "to", "us",
+    "we", "what", "with", "would", "you",
+}  # fmt: skip
+
+
+def normalise(prompt: str) -> list[str]:
+    """Lower case word and number tokens without filler words."""
+    return [token for token in TOKEN.findall(prompt.lower()) if token not in STOPWORDS]
+
+
+def vectorise(tokens: list[str]) -> dict[int, float]:
+    """
+    Sparse, L2 normalised hashing vector over unigrams and bigrams. Bigrams keep
+    some word order, so "sell wheat buy barley" and "buy wheat sell barley"
+    do not look identical.
+    """
+    vector: dict[int, float] = {}
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:], strict=False)]
+    for feature in features:
+        digest = int.from_bytes(
+            hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big"
+        )
+        index = digest % DIMENSIONS
+        sign = 1.0 if digest >> 63 else -1.0
+        vector[index] = vector.get(index, 0.0) + sign
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {index: value / norm for index, value in vector.items()}
+
+
+def similarity(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+class ChatCache:
+    """
+    Answers to stand-alone chat prompts, found again by similarity of their
+    hashed word vectors. Prompts must also mention exactly the same numbers:
+    "100 tonnes" and "200 tonnes" read almost the same but need different
+    answers. Each entry is two Redis keys expiring with the data it used: the
+    small vector and numbers a lookup compares, and the answer itself, fetched
+    only for the best match. A sorted set by expiry time indexes the live ones.
+    """
+
+    index_key = "chatcache:index"
+
+    def vector_key(self, entry_id: str) -> str:
+        return f"chatcache:vector:{entry_id}"
+
+    def entry_key(self, entry_id: str) -> str:
+        return f"chatcache:entry:{entry_id}"
+
+    async def lookup(self, prompt: str) -> dict | None:
+        tokens = normalise(prompt)
+        if not tokens:
+            return None
+        vector = vectorise(tokens)
+        numbers = sorted(token for token in tokens if token[0].isdigit())
+
+        redis = get_redis_client()
+        await redis.zremrangebyscore(self.index_key, "-inf", time.time())
+        entry_ids = await redis.zrange(
+            self.index_key, 0, settings.CHAT_CACHE_MAX_ENTRIES - 1, desc=True
+        )
+        if not entry_ids:
+            return None
+
+        best, best_score = None, settings.CHAT_CACHE_SIMILARITY
+        candidates = await redis.mget([self.vector_key(i) for i in entry_ids])
+        for entry_id, raw in zip(entry_ids, candidates, strict=True):
+            if raw is None:
+                continue
+            candidate = json.loads(raw)
+            if candidate["numbers"] != numbers:
+                continue
+            score = similarity(vector, dict(candidate["vector"]))
+            if score >= best_score:
+                best, best_score = entry_id, score
+        if best is None:
+            return None
+        # Gone when it expired since the vectors were read
+        raw = await redis.get(self.entry_key(best))
+        return json.loads(raw) if raw is not None else None
+
+    async def store(
+        self, prompt: str, text: str, messages: list, tools: set[str]
+    ) -> None:
+        tokens = normalise(prompt)
+        if not tokens:
+            return
+        ttl = min(
+            [TOOL_TTLS.get(tool, DEFAULT_TTL) for tool in tools],
+            default=settings.CHAT_CACHE_TTL_SECONDS,
+        )
+        entry_id = uuid.uuid4().hex
+        candidate = {
+            "numbers": sorted(token for token in tokens if token[0].isdigit()),
+            "vector": list(vectorise(tokens).items()),
+        }
+        entry = {"prompt": prompt, "text": text, "messages": messages}
+        async with get_redis_client().pipeline(transaction=False) as pipe:
+            pipe.set(self.vector_key(entry_id), json.dumps(candidate), ex=ttl)
+            pipe.set(self.entry_key(entry_id), json.dumps(entry), ex=ttl)
+            pipe.zadd(self.index_key, {entry_id: time.time() + ttl})
+            # Only the entries that live longest are kept once the index is full
+            pipe.zremrangebyrank(
+                self.index_key, 0, -settings.CHAT_CACHE_MAX_ENTRIES - 1
+            )
+            await pipe.execute()
+
+
+chat_cache = ChatCache()
@@ -2,7 +2,6 @@ from app.core.postgres import db_pg
 from app.core.config import settings
 from app.core.queries.main import Queries
 import urllib.parse
-from datetime import datetime
 
 
 async def get_image_history():
@@ -24,11 +23,7 @@ async def get_image_history():
             {
                 "original_image_name": row["drawpoint_name"],
                 "original_image_url": original_image_url,
-                "upload_time": (
-                    row["created_date"].isoformat()
-                    if isinstance(row["created_date"], datetime)
-                    else row["created_date"]
-                ),
+                "upload_time": row["created_date"],
                 "processed_image_url": processed_image_url,
                 "fine_area": row["fine_area"],
                 "large_area": row["large_area"],
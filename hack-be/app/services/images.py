@@ -7,7 +7,6 @@ from app.core.postgres import db_pg
 from app.core.config import settings
 from app.core.queries.main import Queries
 import urllib.parse
-from datetime import datetime
 
 from app.services.schema import ImageType
 
@@ -66,16 +65,8 @@ async def get_all_images(pagination: Paginated):
                 "fragmentationComment": row["fragmentationcomment"],
                 "wetnessCommentnd": row["wetnesscomment"],
                 "dp_condition": row["dp_condition"],
-                "uploaded_date": (
-                    row["created_date"].isoformat()
-                    if isinstance(row["created_date"], datetime)
-                    else row["created_date"]
-                ),
-                "image_taken_date": (
-                    row["imagetaken_date"].isoformat()
-                    if isinstance(row["imagetaken_date"], datetime)
-                    else row["imagetaken_date"]
-                ),
+                "uploaded_date": row["created_date"],
+                "image_taken_date": row["imagetaken_date"],
             }
         )
     return results
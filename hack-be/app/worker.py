@@ -0,0 +1,108 @@
+"""
+Background worker for CaveCAD submissions.
+
+Run one process per worker, each with a distinct name so a restarted worker picks
+its unfinished jobs back up:
+
+    python -m app.worker --name worker-1
+
+Without --name the worker is named <hostname>-<pid>, which never clashes with
+a sibling but changes on restart, so its unfinished jobs are not picked up.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.core.config import settings
+from app.core.postgres import db_pg
+from app.core.queue import JobQueue, export_queue
+from app.core.tracing import extract, setup_tracing, shutdown_tracing, tracer
+from app.services.cavecad.jobs import process_submission
+
+logger = logging.getLogger(__name__)
+
+
+async def run_job(queue: JobQueue, worker: str, job_id: str) -> None:
+    job = await queue.get(job_id)
+    if job is None:
+        # Job hash expired while the id sat in the queue
+        await queue.ack(worker, job_id)
+        return
+
+    attempts = job["attempts"] + 1
+    # A child of the request that queued the job, through its stored traceparent
+    with tracer.start_as_current_span(
+        f"{queue.name} process",
+        context=extract(job),
+        kind=SpanKind.CONSUMER,
+        attributes={
+            "messaging.system": "redis",
+            "messaging.destination.name": queue.queue_key,
+            "job.id": job_id,
+            "job.attempt": attempts,
+            "worker.name": worker,
+        },
+    ):
+        await queue.update(job_id, status="running", attempts=attempts)
+        await queue.publish(job_id, "running")
+        try:
+            result = await process_submission(queue, job_id, job)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed on attempt {attempts}: {e}")
+            span = trace.get_current_span()
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            if attempts < settings.JOB_MAX_ATTEMPTS:
+                delay = settings.JOB_RETRY_DELAY_SECONDS * 2 ** (attempts - 1)
+                await queue.update(job_id, status="retrying", error=str(e))
+                await queue.publish(job_id, "retrying")
+                await queue.retry_later(worker, job_id, delay)
+            else:
+                await queue.update(job_id, status="failed", error=str(e))
+                await queue.release(job_id)
+                await queue.publish(job_id, "failed")
+                await queue.ack(worker, job_id)
+            return
+
+        await queue.update(job_id, status="done", result=result)
+        await queue.publish(job_id, "done")
+        await queue.ack(worker, job_id)
+
+
+async def main(worker: str) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    setup_tracing(component="worker")
+    await db_pg.connect()
+    await export_queue.recover(worker)
+    logger.info(f"Worker {worker} listening on {export_queue.queue_key}")
+    try:
+        while not stop.is_set():
+            await export_queue.promote_delayed()
+            job_id = await export_queue.reserve(worker)
+            if job_id:
+                await run_job(export_queue, worker, job_id)
+    finally:
+        await db_pg.disconnect()
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    # Unique by default: workers sharing a name share a processing list, and
+    # recover() would requeue jobs a sibling is still running
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.name))
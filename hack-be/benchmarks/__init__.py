@@ -0,0 +1,39 @@
+"""
+Benchmarks against the throwaway Postgres and Redis of
+benchmarks/docker-compose.yml. Importing the package points the app settings
+at that stack, before any app module reads them, so a benchmark can never
+truncate or flush a real database.
+"""
+
+import os
+import tempfile
+
+POSTGRES_PORT = os.environ.get("BENCH_POSTGRES_PORT", "55432")
+REDIS_PORT = os.environ.get("BENCH_REDIS_PORT", "56379")
+
+os.environ.update(
+    {
+        "POSTGRES_SERVER": "localhost",
+        "POSTGRES_PORT": POSTGRES_PORT,
+        "POSTGRES_USER": "bench",
+        "POSTGRES_PASSWORD": "bench",
+        "POSTGRES_DB": "bench",
+        "REDIS_URL": f"redis://localhost:{REDIS_PORT}/0",
+        "TOOL_CACHE_REDIS_URL": "",
+        # Runner and server process must sign and verify the same tokens
+        "SECRET_KEY": "benchmark-secret-key",
+        "RAW_DIR": os.path.join(tempfile.gettempdir(), "bench-contents"),
+        "USAGE_DAILY_TOKEN_BUDGET": str(10**12),
+        "USAGE_DAILY_REQUEST_BUDGET": str(10**9),
+        "URL": "",
+        "KEY": "",
+    }
+)
+for name, value in {
+    "PROJECT_NAME": "benchmark",
+    "FIRST_SUPERUSER": "bench@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "bench",
+    # Agents build their OpenAI client on import; the benchmarks never call it
+    "OPENAI_API_KEY": "sk-benchmark",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,389 @@
+"""
+Load and latency benchmark of the API. Seeds the stack of
+benchmarks/docker-compose.yml, starts benchmarks.server in its own process and
+drives every endpoint with concurrent clients. Latency percentiles, throughput
+and the server's memory are written per endpoint to a JSON report; given an
+earlier report, regressions beyond the tolerance fail the run.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    python -m benchmarks.api --images 5000 --approvals 2000
+    python -m benchmarks.api --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from websockets.asyncio.client import connect
+
+from app.core import security
+from app.core.config import settings
+from benchmarks import seed
+from benchmarks.data import Dataset, cavecad_batch
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+USER = {"name": "Bench User", "title": "Engineer", "username": "bench", "id": "1"}
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def latency_stats(seconds: list[float]) -> dict:
+    return {
+        f"p{round(q * 100)}": round(percentile(seconds, q) * 1000, 2)
+        for q in (0.5, 0.95, 0.99)
+    } | {"max": round(max(seconds, default=0.0) * 1000, 2)}
+
+
+class ServerProcess:
+    """benchmarks.server in a child process, with its memory read from /proc."""
+
+    def __init__(self, port: int, llm_words: int, llm_delay: float):
+        self.port = port
+        self.args = [
+            sys.executable,
+            "-m",
+            "benchmarks.server",
+            f"--port={port}",
+            f"--llm-words={llm_words}",
+            f"--llm-delay={llm_delay}",
+        ]
+        self.process: subprocess.Popen | None = None
+
+    async def __aenter__(self) -> "ServerProcess":
+        self.process = subprocess.Popen(self.args)
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    await client.get(f"{self.url}{settings.API_V1_STR}/openapi.json")
+                    return self
+                except httpx.TransportError:
+                    await asyncio.sleep(0.2)
+        raise RuntimeError("Benchmark server did not start")
+
+    async def __aexit__(self, *_):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _status(self) -> dict[str, int]:
+        values = {}
+        with open(f"/proc/{self.process.pid}/status") as status:
+            for line in status:
+                name, _, value = line.partition(":")
+                if name in ("VmRSS", "VmHWM"):
+                    values[name] = int(value.split()[0])
+        return values
+
+    def reset_peak(self) -> None:
+        # Writing 5 to clear_refs resets the peak resident set size (Linux only)
+        try:
+            with open(f"/proc/{self.process.pid}/clear_refs", "w") as refs:
+                refs.write("5")
+        except OSError:
+            pass
+
+    def memory(self) -> dict:
+        try:
+            status = self._status()
+        except OSError:
+            return {"rss_mb": None, "peak_rss_mb": None}
+        return {
+            "rss_mb": round(status["VmRSS"] / 1024, 1),
+            "peak_rss_mb": round(status["VmHWM"] / 1024, 1),
+        }
+
+
+async def run_load(
+    request: Callable[[int], Awaitable[dict | None]],
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """
+    Sends requests calls of request(i), at most concurrency at once. A call
+    raises on failure and may return extra timings (seconds) to report.
+    """
+    latencies: list[float] = []
+    extras: dict[str, list[float]] = {}
+    errors: list[str] = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                extra = await request(i)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+            for name, value in (extra or {}).items():
+                extras.setdefault(name, []).append(value)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "latency_ms": latency_stats(latencies),
+    }
+    for name, values in extras.items():
+        result[f"{name}_ms"] = latency_stats(values)
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def check(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+
+async def bench_images(client: httpx.AsyncClient, dataset: Dataset, args) -> dict:
+    pages = max(1, (len(dataset.images) - len(dataset.approvals) // 2) // 30)
+
+    async def request(i):
+        check(await client.get("/images/", params={"page": i % pages + 1}))
+
+    return await run_load(request, args.requests, args.concurrency)
+
+
+async def bench_history(client: httpx.AsyncClient, _dataset: Dataset, args) -> dict:
+    async def request(_i):
+        check(await client.get("/history/"))
+
+    # Every call returns all submitted images, so fewer of them
+    return await run_load(request, max(1, args.requests // 10), args.concurrency)
+
+
+async def bench_upload(client: httpx.AsyncClient, dataset: Dataset, args) -> dict:
+    image = os.urandom(args.upload_kb * 1024)
+
+    async def request(i):
+        drawpoint = dataset.drawpoints[i % len(dataset.drawpoints)]
+        files = [("files", (f"{drawpoint}_{i}.jpg", image, "image/jpeg"))]
+        check(await client.post("/images/upload/", files=files))
+
+    return await run_load(request, args.requests, args.concurrency)
+
+
+async def bench_cavecad(client: httpx.AsyncClient, dataset: Dataset, args) -> dict:
+    batch = {
+        "data": [
+            record.model_dump(mode="json")
+            for record in cavecad_batch(dataset, args.batch_size)
+        ]
+    }
+
+    async def request(_i):
+        # A fresh key per call, or the API would answer the replayed job
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        check(await client.post("/cavecad/", json=batch, headers=headers))
+
+    return await run_load(request, args.requests, args.concurrency)
+
+
+async def bench_chat(client: httpx.AsyncClient, _dataset: Dataset, args) -> dict:
+    async def request(i):
+        start = time.perf_counter()
+        first_delta = None
+        event = None
+        async with client.stream(
+            "POST", "/stream/chat/", json={"prompt": f"Allocate {i} tonnes"}
+        ) as response:
+            check(response)
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line.removeprefix("event: ")
+                    if event == "delta" and first_delta is None:
+                        first_delta = time.perf_counter() - start
+                    if event in ("done", "error", "cancelled"):
+                        break
+        if event != "done":
+            raise RuntimeError(f"Stream ended with {event}")
+        return {"first_delta": first_delta}
+
+    return await run_load(
+        request, max(1, args.requests // 5), min(args.concurrency, 20)
+    )
+
+
+async def bench_ws(client: httpx.AsyncClient, _dataset: Dataset, args) -> dict:
+    """
+    Broadcast fan-out: one client sends, every connected client receives. A
+    message carries its send time, so each delivery gives one latency sample.
+    """
+    ws_url = str(client.base_url).replace("http", "ws", 1).rstrip("/") + "/ws/"
+    messages = max(1, args.requests // 10)
+    latencies: list[float] = []
+    clients = [await connect(ws_url) for _ in range(args.ws_clients)]
+
+    async def receive(ws, expected: int):
+        for _ in range(expected):
+            text = await ws.recv()
+            sent = float(text.rpartition("says: ")[2])
+            latencies.append(time.perf_counter() - sent)
+
+    try:
+        receivers = [asyncio.create_task(receive(ws, messages)) for ws in clients[1:]]
+        sender = clients[0]
+        start = time.perf_counter()
+        for _ in range(messages):
+            # One message in flight, so queueing does not pile up in the samples
+            echo = asyncio.create_task(receive(sender, 1))
+            await sender.send(str(time.perf_counter()))
+            await asyncio.wait_for(echo, 10)
+        await asyncio.wait_for(asyncio.gather(*receivers), 30)
+        wall = time.perf_counter() - start
+    finally:
+        for ws in clients:
+            await ws.close()
+
+    return {
+        "requests": messages,
+        "concurrency": args.ws_clients,
+        "errors": messages * args.ws_clients - len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "latency_ms": latency_stats(latencies),
+    }
+
+
+SCENARIOS = {
+    "images": bench_images,
+    "history": bench_history,
+    "upload": bench_upload,
+    "cavecad": bench_cavecad,
+    "ws": bench_ws,
+    "chat": bench_chat,
+}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    dataset = await seed.seed(args.drawpoints, args.images, args.approvals, args.seed)
+    token = security.create_access_token(
+        USER, timedelta(hours=1), session_id=uuid.uuid4().hex
+    )
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "parameters": {
+                name: value
+                for name, value in vars(args).items()
+                if name not in ("compare", "output", "only")
+            },
+        },
+        "endpoints": {},
+    }
+
+    async with ServerProcess(args.port, args.llm_words, args.llm_delay) as server:
+        async with httpx.AsyncClient(
+            base_url=f"{server.url}{settings.API_V1_STR}",
+            cookies={settings.TOKEN_KEY: token},
+            timeout=60,
+            limits=httpx.Limits(max_connections=args.concurrency * 2),
+        ) as client:
+            for name, scenario in SCENARIOS.items():
+                if args.only and name not in args.only:
+                    continue
+                server.reset_peak()
+                result = await scenario(client, dataset, args) | server.memory()
+                report["endpoints"][name] = result
+                logger.info(f"{name}: {json.dumps(result)}")
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Endpoints whose p95 latency or throughput got worse than tolerance allows."""
+    regressions = []
+    for name, result in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        p95, p95_before = result["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        rps, rps_before = result["throughput_rps"], before["throughput_rps"]
+        print(
+            f"{name:10} p95 {p95_before:9.2f} -> {p95:9.2f} ms   "
+            f"throughput {rps_before:8.1f} -> {rps:8.1f} req/s"
+        )
+        if p95_before and p95 > p95_before * (1 + tolerance):
+            regressions.append(f"{name}: p95 {p95_before} -> {p95} ms")
+        if rps_before and rps < rps_before * (1 - tolerance):
+            regressions.append(f"{name}: throughput {rps_before} -> {rps} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load benchmark.")
+    seed.add_arguments(parser)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--ws-clients", type=int, default=50)
+    parser.add_argument("--llm-words", type=int, default=60)
+    parser.add_argument("--llm-delay", type=float, default=0.005)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--only", nargs="*", choices=list(SCENARIOS))
+    parser.add_argument("--output", help="report path, default results/<date>.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(run(args))
+
+    output = Path(args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {output}")
+
+    if args.compare:
+        regressions = compare(
+            report, json.loads(Path(args.compare).read_text()), args.tolerance
+        )
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
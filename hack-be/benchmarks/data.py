@@ -0,0 +1,187 @@
+"""
+Synthetic drawpoints, fragmentation images and approvals. The same seed always
+gives the same dataset, so runs on different commits are comparable.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.services.cavecad.schema import CavecadType
+
+START = datetime(2025, 1, 1, 6, 0)
+USERNAMES = ["bold.b", "saraa.t", "temuulen.g", "oyun.e", "ganzorig.d"]
+CONDITION_COMMENTS = [
+    "Brow intact",
+    "Minor spalling on the left pillar",
+    "Hang-up cleared during shift",
+    "",
+]
+FRAGMENTATION_COMMENTS = [
+    "Coarse material at the brow",
+    "Fines increasing",
+    "Two oversize rocks, secondary breaking requested",
+    "",
+]
+WETNESS_COMMENTS = ["Dry", "Damp muck", "Water running from the back", ""]
+
+
+@dataclass
+class Dataset:
+    drawpoints: list[str]
+    # drawpoint_hierarchy rows, the stand-in for CaveCAD
+    hierarchy: list[dict] = field(default_factory=list)
+    images: list[dict] = field(default_factory=list)
+    approvals: list[dict] = field(default_factory=list)
+
+
+def drawpoint_names(count: int) -> list[str]:
+    """Drawpoints on both sides of numbered extraction drives, e.g. 07W12."""
+    return [
+        f"{i // 40 + 1:02d}{'EW'[i % 2]}{(i % 40) // 2 + 1:02d}" for i in range(count)
+    ]
+
+
+def hierarchy_row(drawpoint: str) -> dict:
+    drive, side = drawpoint[:2], drawpoint[2]
+    return {
+        "drawpoint_name": drawpoint,
+        "project_id": "OT-UG",
+        "panel": settings.CAVECAD_PANEL,
+        "area": settings.CAVECAD_AREA,
+        "primary_heading": f"XC{drive}",
+        "secondary_heading": f"XC{drive}-{side}",
+        "synced_date": START,
+    }
+
+
+def fragmentation(rng: random.Random) -> list[float]:
+    """Five size class percentages adding up to 100, coarse classes rarer."""
+    weights = [rng.uniform(0.5, 3) / (size + 1) for size in range(5)]
+    total = sum(weights)
+    return [round(100 * weight / total, 1) for weight in weights]
+
+
+def generate(
+    drawpoints: int = 200, images: int = 5000, approvals: int = 2000, seed: int = 0
+) -> Dataset:
+    rng = random.Random(seed)
+    dataset = Dataset(drawpoint_names(drawpoints))
+    dataset.hierarchy = [hierarchy_row(dp) for dp in dataset.drawpoints]
+
+    for image_id in range(1, images + 1):
+        drawpoint = rng.choice(dataset.drawpoints)
+        taken = START + timedelta(minutes=rng.randrange(90 * 24 * 60))
+        path = f"/P0/XD{drawpoint[:2]}/raw/{drawpoint}/{drawpoint}_{image_id}.jpg"
+        fine, small, medium, large, oversized = fragmentation(rng)
+        dataset.images.append(
+            {
+                "id": image_id,
+                "drawpoint_name": drawpoint,
+                "edited_dp_name": None,
+                "fine_area": fine,
+                "small_area": small,
+                "medium_area": medium,
+                "large_area": large,
+                "oversized_area": oversized,
+                "raw_image_path": path,
+                "predicted_image_path": path.replace("/raw/", "/predicted/"),
+                "bbox_image_path": path.replace("/raw/", "/bbox/"),
+                "has_bund": rng.choice(["yes", "no"]),
+                "image_status": "processed",
+                "is_edited": "No",
+                "imagetaken_date": taken,
+                "created_date": taken + timedelta(minutes=rng.randrange(5, 120)),
+                "updated_date": None,
+            }
+        )
+
+    for image in rng.sample(dataset.images, min(approvals, images)):
+        submitted = rng.random() < 0.5
+        image["image_status"] = "submitted" if submitted else "approved"
+        areas = fragmentation(rng)
+        dataset.approvals.append(
+            {
+                "image_id": image["id"],
+                "drawpoint_name": image["drawpoint_name"],
+                "new_fine_area": areas[0],
+                "new_small_area": areas[1],
+                "new_medium_area": areas[2],
+                "new_large_area": areas[3],
+                "new_oversized_area": areas[4],
+                "dp_condition": rng.randint(1, 6),
+                "bund": image["has_bund"],
+                "wetness": rng.randint(1, 3),
+                "drawpointconditioncomment": rng.choice(CONDITION_COMMENTS),
+                "fragmentationcomment": rng.choice(FRAGMENTATION_COMMENTS),
+                "wetnesscomment": rng.choice(WETNESS_COMMENTS),
+                "username": rng.choice(USERNAMES),
+                "submitted_date": image["created_date"] + timedelta(hours=1)
+                if submitted
+                else None,
+                "created_date": image["created_date"] + timedelta(minutes=30),
+            }
+        )
+    return dataset
+
+
+def cavecad_batch(dataset: Dataset, size: int, seed: int = 0) -> list[CavecadType]:
+    """A submission as the dashboard sends it to POST /cavecad/."""
+    rng = random.Random(seed)
+    batch = []
+    for image in rng.sample(dataset.images, min(size, len(dataset.images))):
+        areas = [round(value) for value in fragmentation(rng)]
+        condition = str(rng.randint(1, 6))
+        batch.append(
+            CavecadType(
+                username=rng.choice(USERNAMES),
+                image_id=image["id"],
+                drawpoint_name=image["drawpoint_name"],
+                raw_image_url=f"{settings.CONTENT_URL}{image['raw_image_path']}",
+                predicted_image_url=f"{settings.CONTENT_URL}{image['predicted_image_path']}",
+                fine_area=areas[0],
+                small_area=areas[1],
+                medium_area=areas[2],
+                large_area=areas[3],
+                oversized_area=areas[4],
+                bbox=f"{settings.CONTENT_URL}{image['bbox_image_path']}",
+                edited="No",
+                image_status="approved",
+                bund=image["has_bund"],
+                wetness=str(rng.randint(1, 3)),
+                condition=condition,
+                drawpointConditionComment=rng.choice(CONDITION_COMMENTS),
+                fragmentationComment=rng.choice(FRAGMENTATION_COMMENTS),
+                wetnessCommentnd=None,
+                dp_condition=condition,
+                uploaded_date=image["created_date"],
+                image_taken_date=image["imagetaken_date"],
+                id=image["id"],
+                upload_time=image["created_date"] + timedelta(hours=2),
+                wetnessComment=rng.choice(WETNESS_COMMENTS),
+            )
+        )
+    return batch
+
+
+def export_batch(
+    size: int, drawpoints: int = 200, username: str = "bench", seed: int = 0
+) -> tuple[list[dict], list[dict]]:
+    """
+    The inputs of create_and_dump_csv for a batch of size records: the records
+    as the export job passes them, and the hierarchy rows fetch_cavecad_data
+    returns for their drawpoints.
+    """
+    dataset = generate(drawpoints, images=size, approvals=0, seed=seed)
+    records = [
+        {**record.model_dump(), "username": username}
+        for record in cavecad_batch(dataset, size, seed)
+    ]
+    submitted = {record["drawpoint_name"] for record in records}
+    hierarchy = [
+        {key: value for key, value in row.items() if key != "synced_date"}
+        for row in dataset.hierarchy
+        if row["drawpoint_name"] in submitted
+    ]
+    return records, hierarchy
@@ -0,0 +1,201 @@
+"""
+Microbenchmarks of the CaveCAD export at 10, 1k and 100k records. Every stage
+(merge, formatting, CSV writing, Parquet, and the whole create_and_dump_csv)
+is timed over several runs, then run once more under tracemalloc for its peak
+memory, so tracing does not skew the timings.
+
+The CSVs of each size must match the digests in golden_export.json byte for
+byte; any faster engine has to produce exactly what CaveCAD imports today.
+After an intended format change, record new digests with --update-golden.
+
+    python -m benchmarks.export
+    python -m benchmarks.export --sizes 10 1000 --fetch   # needs the compose stack
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.cavecad.columnar import write_parquet_batch
+from app.services.cavecad.main import (
+    create_and_dump_csv,
+    fetch_cavecad_data,
+    format_csv_rows,
+    merge_records,
+    write_csv_exports,
+)
+from benchmarks import seed
+from benchmarks.data import Dataset, export_batch
+
+GOLDEN = Path(__file__).parent / "golden_export.json"
+RESULTS_DIR = Path(__file__).parent / "results"
+CSV_FILES = {
+    "Monitored DP Data": "MonitoredDPData.csv",
+    "Monitored Fragmentation": "MonitoredFragmentation.csv",
+    "Water Monitoring": "WaterMonitoring.csv",
+}
+
+
+def uat_paths(root: Path) -> dict[str, str]:
+    return {key: str(root / key.replace(" ", "_")) for key in settings.UAT_PATHS}
+
+
+def measure(function, repeat: int) -> dict:
+    """
+    Median and best wall time of repeat calls after a warm-up call, then the
+    peak of one traced call.
+    """
+    function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "best_ms": round(min(timings) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def digests(root: Path) -> dict[str, str]:
+    paths = uat_paths(root)
+    return {
+        filename: hashlib.sha256((Path(paths[key]) / filename).read_bytes()).hexdigest()
+        for key, filename in CSV_FILES.items()
+    }
+
+
+async def measure_fetch(records: list[dict], hierarchy: list[dict], repeat: int):
+    """Hierarchy lookup in the benchmark Postgres, loaded with the stand-in rows."""
+    await seed.db_pg.connect()
+    try:
+        drawpoints = sorted({row["drawpoint_name"] for row in hierarchy})
+        await seed.load(
+            Dataset(
+                drawpoints,
+                [{**row, "synced_date": datetime.now()} for row in hierarchy],
+            )
+        )
+        submitted = [record["drawpoint_name"] for record in records]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = await fetch_cavecad_data(submitted)
+            timings.append(time.perf_counter() - start)
+        if len(rows) != len(hierarchy):
+            raise RuntimeError(f"Fetched {len(rows)} of {len(hierarchy)} drawpoints")
+    finally:
+        await seed.db_pg.disconnect()
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "best_ms": round(min(timings) * 1000, 3),
+        "peak_kib": None,
+    }
+
+
+def bench_size(size: int, args) -> tuple[dict, dict[str, str]]:
+    records, hierarchy = export_batch(size, args.drawpoints, seed=args.seed)
+    repeat = args.repeat if size < 100_000 else max(1, args.repeat // 2)
+    merged = merge_records(records, hierarchy)
+    csv_rows = format_csv_rows(merged)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        stages = {}
+        if args.fetch:
+            stages["fetch"] = asyncio.run(measure_fetch(records, hierarchy, repeat))
+        stages["merge"] = measure(lambda: merge_records(records, hierarchy), repeat)
+        stages["format"] = measure(lambda: format_csv_rows(merged), repeat)
+        stages["write_csv"] = measure(
+            lambda: write_csv_exports(csv_rows, uat_paths(root / "csv")), repeat
+        )
+        stages["parquet"] = measure(
+            lambda: write_parquet_batch(merged, str(root / "parquet")), repeat
+        )
+        stages["total"] = measure(
+            lambda: create_and_dump_csv(
+                records, hierarchy, uat_paths(root / "total"), str(root / "parquet")
+            ),
+            repeat,
+        )
+        for stage in stages.values():
+            stage["per_record_us"] = round(stage["median_ms"] * 1000 / size, 3)
+        return stages, digests(root / "total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CaveCAD export microbenchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000])
+    parser.add_argument("--drawpoints", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--fetch", action="store_true", help="also time fetch_cavecad_data"
+    )
+    parser.add_argument("--update-golden", action="store_true")
+    args = parser.parse_args()
+
+    golden = json.loads(GOLDEN.read_text()) if GOLDEN.exists() else {}
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "drawpoints": args.drawpoints,
+            "seed": args.seed,
+        },
+        "sizes": {},
+    }
+    mismatches = []
+    print(
+        f"{'records':>8} {'stage':10} {'median ms':>11} {'us/record':>10} {'peak KiB':>10}"
+    )
+    for size in args.sizes:
+        stages, output = bench_size(size, args)
+        report["sizes"][str(size)] = stages
+        for name, stage in stages.items():
+            print(
+                f"{size:>8} {name:10} {stage['median_ms']:>11.3f} "
+                f"{stage['per_record_us']:>10.3f} {stage['peak_kib'] or '-':>10}"
+            )
+
+        key = f"{size}:{args.drawpoints}:{args.seed}"
+        if args.update_golden:
+            golden[key] = output
+        elif key in golden and golden[key] != output:
+            mismatches.extend(
+                f"{size} records: {name} differs"
+                for name in output
+                if output[name] != golden[key].get(name)
+            )
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = RESULTS_DIR / f"export-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output_path.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {output_path}")
+
+    if args.update_golden:
+        GOLDEN.write_text(json.dumps(golden, indent=2, sort_keys=True) + "\n")
+        print(f"Golden digests written to {GOLDEN}")
+    elif mismatches:
+        print("Output differs from the golden export:\n  " + "\n  ".join(mismatches))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Loads a synthetic dataset into the benchmark Postgres and empties the benchmark
+Redis, so every run starts from the same state.
+
+    python -m benchmarks.seed --drawpoints 200 --images 5000 --approvals 2000
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core.db import initialize_tables
+from app.core.postgres import db_pg
+from app.core.redis import get_redis_client
+from benchmarks.data import Dataset, generate
+
+logger = logging.getLogger(__name__)
+
+# Same as hackaton-agent-fe/scripts/003_add_chat_history.sql, which Supabase runs
+CHAT_MESSAGES_TABLE = """
+    CREATE TABLE IF NOT EXISTS chat_messages (
+      id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+      user_id VARCHAR(255) NOT NULL,
+      conversation_id UUID NOT NULL,
+      messages JSONB NOT NULL,
+      token_estimate INTEGER NOT NULL DEFAULT 0,
+      created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+    CREATE INDEX IF NOT EXISTS idx_chat_messages_user_conversation
+      ON chat_messages(user_id, conversation_id, id DESC);
+"""
+
+
+async def _copy(connection, table: str, rows: list[dict]) -> None:
+    if rows:
+        columns = list(rows[0])
+        await connection.copy_records_to_table(
+            table,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+
+
+async def load(dataset: Dataset) -> None:
+    await initialize_tables(db_pg)
+    await db_pg.execute_command(CHAT_MESSAGES_TABLE)
+    async with db_pg.get_connection() as connection:
+        async with connection.transaction():
+            await connection.execute(
+                "TRUNCATE fragmentation_images, approved_fragmentation, "
+                "drawpoint_hierarchy, chat_messages RESTART IDENTITY"
+            )
+            await _copy(connection, "drawpoint_hierarchy", dataset.hierarchy)
+            await _copy(connection, "fragmentation_images", dataset.images)
+            await _copy(connection, "approved_fragmentation", dataset.approvals)
+            # Images were copied with their ids, move the sequence past them
+            await connection.execute(
+                "SELECT setval(pg_get_serial_sequence('fragmentation_images', 'id'), "
+                "GREATEST((SELECT max(id) FROM fragmentation_images), 1))"
+            )
+        await connection.execute(
+            "ANALYZE fragmentation_images, approved_fragmentation, drawpoint_hierarchy"
+        )
+    await get_redis_client().flushdb()
+    logger.info(
+        f"Seeded {len(dataset.drawpoints)} drawpoints, {len(dataset.images)} images "
+        f"and {len(dataset.approvals)} approvals"
+    )
+
+
+async def seed(
+    drawpoints: int = 200, images: int = 5000, approvals: int = 2000, seed: int = 0
+) -> Dataset:
+    dataset = generate(drawpoints, images, approvals, seed)
+    await db_pg.connect()
+    try:
+        await load(dataset)
+    finally:
+        await db_pg.disconnect()
+    return dataset
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--drawpoints", type=int, default=200)
+    parser.add_argument("--images", type=int, default=5000)
+    parser.add_argument("--approvals", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the benchmark database.")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(seed(args.drawpoints, args.images, args.approvals, args.seed))
@@ -0,0 +1,160 @@
+"""
+The API as the benchmarks run it: the secured routes mounted, the app database
+connected, Supabase answered from the benchmark Postgres and the chat agent
+answered by a fake model that streams at a fixed rate. Started by
+benchmarks.api in its own process, so the load generator does not share its
+event loop.
+
+    python -m benchmarks.server --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import uvicorn
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from app.api.secure import secure_router
+from app.core.config import settings
+from app.core.postgres import db_pg
+from app.main import app
+from app.services.cavecad.hierarchy import hierarchy_sync
+from src import stream_test
+from src.db import get_supabase
+
+ANSWER = (
+    "Send 400 kilos of spent grain to Happy Cow Farming as cattle feed and the "
+    "remaining 200 kilos to the anaerobic digester. Feed prices are up this week "
+    "while the digester runs below capacity, so this split maximises margin and "
+    "keeps transport distances short. Shall I proceed with this allocation? "
+)
+
+
+def fake_llm(words: int, delay: float) -> FunctionModel:
+    """Answers every prompt with words words, one every delay seconds."""
+    text = " ".join((ANSWER.split() * (words // len(ANSWER.split()) + 1))[:words])
+
+    async def respond(_messages, _info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(delay * words)
+        return ModelResponse(parts=[TextPart(text)])
+
+    async def stream(_messages, _info: AgentInfo):
+        for word in text.split(" "):
+            await asyncio.sleep(delay)
+            yield word + " "
+
+    return FunctionModel(respond, stream_function=stream, model_name="fake")
+
+
+class LocalQuery:
+    """
+    The part of the Supabase query builder the API uses, run as SQL on the
+    benchmark Postgres. Table and column names only ever come from app code.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self.row: dict | None = None
+        self.columns = "*"
+        self.filters: list[tuple[str, str, object]] = []
+        self.order_by = ""
+        self.limit_count: int | None = None
+
+    def insert(self, row: dict) -> "LocalQuery":
+        self.row = row
+        return self
+
+    def select(self, columns: str = "*") -> "LocalQuery":
+        self.columns = columns
+        return self
+
+    def eq(self, column: str, value) -> "LocalQuery":
+        self.filters.append((column, "=", value))
+        return self
+
+    def lt(self, column: str, value) -> "LocalQuery":
+        self.filters.append((column, "<", value))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "LocalQuery":
+        self.order_by = f" ORDER BY {column}{' DESC' if desc else ''}"
+        return self
+
+    def limit(self, count: int) -> "LocalQuery":
+        self.limit_count = count
+        return self
+
+    async def execute(self) -> SimpleNamespace:
+        if self.row is not None:
+            columns = list(self.row)
+            values = [
+                json.dumps(value) if isinstance(value, dict | list) else value
+                for value in self.row.values()
+            ]
+            placeholders = ", ".join(f"${i}" for i in range(1, len(values) + 1))
+            query = (
+                f"INSERT INTO {self.table} ({', '.join(columns)}) "
+                f"VALUES ({placeholders}) RETURNING *"
+            )
+            return SimpleNamespace(data=await db_pg.execute_query(query, *values))
+
+        where = " AND ".join(
+            f"{column} {op} ${i}"
+            for i, (column, op, _) in enumerate(self.filters, start=1)
+        )
+        query = f"SELECT {self.columns} FROM {self.table}"
+        if where:
+            query += f" WHERE {where}"
+        query += self.order_by
+        if self.limit_count is not None:
+            query += f" LIMIT {int(self.limit_count)}"
+        rows = await db_pg.execute_query(query, *(value for *_, value in self.filters))
+        for row in rows:
+            for column, value in row.items():
+                if column == "messages" and isinstance(value, str):
+                    row[column] = json.loads(value)
+        return SimpleNamespace(data=rows)
+
+
+class LocalSupabase:
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(name)
+
+
+def build(words: int, delay: float):
+    app.include_router(secure_router, prefix=settings.API_V1_STR)
+    app.dependency_overrides[get_supabase] = LocalSupabase
+    stream_test.agent.model = fake_llm(words, delay)
+
+    app_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await db_pg.connect()
+        async with app_lifespan(app):
+            # The seeded mirror is the whole hierarchy, there is no CaveCAD to sync
+            await hierarchy_sync.stop()
+            yield
+        await db_pg.disconnect()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API for the benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-words", type=int, default=60)
+    parser.add_argument("--llm-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        build(args.llm_words, args.llm_delay),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    )
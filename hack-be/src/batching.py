@@ -0,0 +1,64 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class MicroBatcher:
+    """
+    Collects requests that arrive within window seconds of each other and
+    share a group key (e.g. the same query parameters), then fetches them all
+    with one call to fetch_many(group, items). It returns a result per item; an
+    exception as the result fails only that item.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[Hashable, list], Awaitable[dict]],
+        window: float = 0.02,
+        max_items: int = 50,
+    ):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_items = max_items
+        self.pending: dict[Hashable, dict[Hashable, asyncio.Future]] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    async def submit(self, group: Hashable, item: Hashable):
+        batch = self.pending.get(group)
+        if batch is None:
+            batch = self.pending[group] = {}
+            asyncio.get_running_loop().call_later(
+                self.window, lambda: self._flush(group, batch)
+            )
+
+        future = batch.get(item)
+        if future is None:
+            future = batch[item] = asyncio.get_running_loop().create_future()
+            if len(batch) >= self.max_items:
+                self._flush(group, batch)
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Hashable, batch: dict) -> None:
+        # The timer may fire after a full batch was already sent
+        if self.pending.get(group) is not batch:
+            return
+        del self.pending[group]
+        task = asyncio.create_task(self._run(group, batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, group: Hashable, batch: dict) -> None:
+        try:
+            results = await self.fetch_many(group, list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for item, future in batch.items():
+            if future.done():
+                continue
+            result = results.get(item, KeyError(item))
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,92 @@
+import uuid
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+from supabase import AsyncClient
+
+from src.config import settings
+
+TABLE = "chat_messages"
+
+
+def estimate_tokens(messages: list) -> int:
+    # Roughly four characters per token, close enough to size a prompt window
+    return len(ModelMessagesTypeAdapter.dump_json(messages)) // 4
+
+
+async def save_run(
+    session: AsyncClient,
+    user_id: str,
+    conversation_id: uuid.UUID,
+    messages: list[ModelMessage],
+) -> None:
+    """Stores the messages produced by one agent run of user_id's conversation."""
+    await (
+        session.table(TABLE)
+        .insert(
+            {
+                "user_id": user_id,
+                "conversation_id": str(conversation_id),
+                "messages": ModelMessagesTypeAdapter.dump_python(messages, mode="json"),
+                "token_estimate": estimate_tokens(messages),
+            }
+        )
+        .execute()
+    )
+
+
+async def fetch_runs(
+    session: AsyncClient,
+    user_id: str,
+    conversation_id: uuid.UUID,
+    limit: int,
+    before: int | None = None,
+) -> list[dict]:
+    """
+    A page of stored runs, newest first. Pass the last id seen as before. Only
+    user_id's own runs are returned, whoever else used the conversation id.
+    """
+    query = (
+        session.table(TABLE)
+        .select("id,messages,token_estimate,created_at")
+        .eq("user_id", user_id)
+        .eq("conversation_id", str(conversation_id))
+    )
+    if before is not None:
+        query = query.lt("id", before)
+    response = await query.order("id", desc=True).limit(limit).execute()
+    return response.data
+
+
+async def load_history(
+    session: AsyncClient,
+    user_id: str,
+    conversation_id: uuid.UUID,
+    token_budget: int = settings.CHAT_HISTORY_TOKEN_BUDGET,
+) -> list[ModelMessage]:
+    """
+    The most recent runs of a conversation that fit in token_budget, oldest
+    first. Pages are only fetched until the budget is used up, and whole runs are
+    kept so tool calls are never separated from their returns.
+    """
+    runs = []
+    used = 0
+    before = None
+    while True:
+        page = await fetch_runs(
+            session, user_id, conversation_id, settings.CHAT_HISTORY_PAGE_SIZE, before
+        )
+        for run in page:
+            used += run["token_estimate"]
+            if used > token_budget:
+                return _decode(runs)
+            runs.append(run)
+        if len(page) < settings.CHAT_HISTORY_PAGE_SIZE:
+            return _decode(runs)
+        before = page[-1]["id"]
+
+
+def _decode(runs: list[dict]) -> list[ModelMessage]:
+    messages = []
+    for run in reversed(runs):
+        messages.extend(ModelMessagesTypeAdapter.validate_python(run["messages"]))
+    return messages
@@ -9,6 +9,26 @@ class Settings(BaseSettings):
     )
     URL: str = ""
     KEY: str = ""
+    # Prompt history older than this many (estimated) tokens is left out
+    CHAT_HISTORY_TOKEN_BUDGET: int = 6000
+    CHAT_HISTORY_PAGE_SIZE: int = 20
+    # Shares tool results between workers when set, e.g. redis://localhost
+    TOOL_CACHE_REDIS_URL: str = ""
+    TOOL_CACHE_SIZE: int = 512
+    # Yahoo Finance calls run in this many threads, off the event loop
+    MARKET_DATA_WORKERS: int = 4
+    MARKET_DATA_TIMEOUT_SECONDS: int = 20
+    WEATHER_TIMEOUT_SECONDS: int = 10
+    # Futures bars are kept here and only missing ranges are downloaded
+    MARKET_STORE_PATH: str = "market_data.sqlite3"
+    # Answer from the store alone, e.g. in tests against a recorded store
+    MARKET_DATA_OFFLINE: bool = False
+    # Insight generations per dashboard refresh and how many run at once
+    INSIGHT_COUNT: int = 4
+    INSIGHT_CONCURRENCY: int = 4
+    # Dashboard polling within this window is answered from memory
+    INSIGHTS_CACHE_SECONDS: int = 10
+    INSIGHTS_PAGE_SIZE: int = 20
 
 
 settings = Settings()
@@ -1,11 +1,13 @@
-import os
+import logging
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Request
 from supabase import AsyncClient, acreate_client
 
 from src.config import settings
 
+logger = logging.getLogger(__name__)
+
 url: str = settings.URL
 key: str = settings.KEY
 
@@ -15,7 +17,23 @@ async def create_supabase():
     return supabase
 
 
-DbDep = Annotated[AsyncClient, Depends(create_supabase)]
+async def connect_supabase(app) -> None:
+    """Creates the one Supabase client the API shares, kept on app.state."""
+    app.state.supabase = None
+    if not url or not key:
+        logger.warning("Supabase URL/KEY not set, Supabase routes are disabled")
+        return
+    app.state.supabase = await create_supabase()
+
+
+def get_supabase(request: Request) -> AsyncClient:
+    supabase = getattr(request.app.state, "supabase", None)
+    if supabase is None:
+        raise HTTPException(status_code=503, detail="Supabase is not configured")
+    return supabase
+
+
+DbDep = Annotated[AsyncClient, Depends(get_supabase)]
 
 
 # response = supabase.table("insights").select("*").execute()
@@ -3,8 +3,10 @@
 Modified version that allows agents to automatically purchase tickets based on criteria.
 """
 
+import asyncio
 import datetime
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 from typing import Literal
 
 import logfire
@@ -12,6 +14,8 @@ from pydantic import BaseModel, Field
 from pydantic_ai import Agent, ModelRetry, RunContext, RunUsage, UsageLimits
 from pydantic_ai.messages import ModelMessage
 
+from src.usage_limits import AGENT_LIMITS
+
 
 class SeatPreference(BaseModel):
     row: int = Field(ge=1, le=30)
@@ -51,6 +55,15 @@ class PurchaseRules(BaseModel):
     prefer_direct_flights: bool = True
 
 
+@dataclass
+class Candidate:
+    """A matching flight with the seat already chosen for it."""
+
+    flight: FlightDetails
+    seat: SeatPreference
+    auto_purchase: bool
+
+
 @dataclass
 class Deps:
     web_page_text: str
@@ -59,9 +72,23 @@ class Deps:
     req_date: datetime.date
     purchase_rules: PurchaseRules
     auto_purchase: bool = True  # Enable autonomous purchasing
+    candidates: list[Candidate] = field(default_factory=list)
+
+
+# Cheapest matching flights that get a seat chosen before the agent decides
+SEAT_CANDIDATES = 3
+
+FLIGHT_BLOCK = re.compile(
+    r"Flight\s+(?P<number>[A-Z0-9]+(?:-[A-Z0-9]+)*)(?P<body>.*?)(?=Flight\s+[A-Z0-9]|\Z)",
+    re.S,
+)
+PRICE = re.compile(r"Price:\s*\$?\s*(\d[\d,]*)")
+ORIGIN = re.compile(r"Origin:[^\n]*?\(([A-Z]{3})\)")
+DESTINATION = re.compile(r"Destination:[^\n]*?\(([A-Z]{3})\)")
+# At the start of a line, so "Return Date:" or "Booking date:" in a note is not read
+DATE = re.compile(r"^[\s*•-]*Date:\s*([^\n]+)", re.M)
 
 
-# Enhanced search agent that can make purchase decisions
 search_agent = Agent[Deps, PurchaseDecision](
     "openai:gpt-4o",
     output_type=PurchaseDecision,
@@ -69,14 +96,15 @@ search_agent = Agent[Deps, PurchaseDecision](
     retries=4,
     system_prompt=(
         "You are a flight booking agent that can make autonomous purchasing decisions. "
-        "Your job is to find the best flight for the user and decide whether to purchase it. "
+        "You are given the flights that match the user's route and date, cheapest first, "
+        "each with a seat already chosen. Decide which one, if any, to buy. "
         "Consider factors like price, timing, and user preferences. "
-        "If auto_purchase is enabled and you find a suitable flight within budget, you should purchase it. "
+        "If auto_purchase is enabled and a flight is within budget, you should purchase it. "
         "Always provide clear reasoning for your decision."
     ),
 )
 
-# Flight extraction agent (same as before)
+# Fallback for pages the regular expressions cannot read
 extraction_agent = Agent(
     "openai:gpt-4o",
     output_type=list[FlightDetails],
@@ -100,74 +128,159 @@ seat_selection_agent = Agent[FlightDetails, SeatPreference](
 )
 
 
-@search_agent.tool
-async def extract_flights(ctx: RunContext[Deps]) -> list[FlightDetails]:
-    """Get details of all flights."""
-    result = await extraction_agent.run(ctx.deps.web_page_text, usage=ctx.usage)
-    logfire.info("found {flight_count} flights", flight_count=len(result.output))
-    return result.output
-
-
-@search_agent.tool
-async def analyze_flight_options(
-    ctx: RunContext[Deps], flights: list[FlightDetails]
-) -> str:
-    """Analyze available flights and provide recommendations."""
-    if not flights:
-        return "No flights available for the requested route and date."
-
-    # Filter flights that match criteria
-    matching_flights = [
-        f
-        for f in flights
-        if (
-            f.origin == ctx.deps.req_origin
-            and f.destination == ctx.deps.req_destination
-            and f.date == ctx.deps.req_date
+def _parse_date(text: str) -> datetime.date | None:
+    for fmt in ("%B %d, %Y", "%b %d, %Y", "%Y-%m-%d", "%d %B %Y"):
+        try:
+            return datetime.datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_flights(text: str) -> tuple[list[FlightDetails], list[str]]:
+    """
+    Flights of a listing page, read without a model, and the text of the
+    entries that could not be read.
+    """
+    flights, unread = [], []
+    for block in FLIGHT_BLOCK.finditer(text):
+        body = block["body"]
+        price, origin, destination, date = (
+            pattern.search(body) for pattern in (PRICE, ORIGIN, DESTINATION, DATE)
         )
-    ]
-
-    if not matching_flights:
-        return "No flights match the requested criteria."
-
-    # Sort by price
-    matching_flights.sort(key=lambda x: x.price)
-
-    analysis = f"Found {len(matching_flights)} matching flights:\n"
-    for flight in matching_flights:
-        within_budget = flight.price <= ctx.deps.purchase_rules.max_budget
-        analysis += f"- {flight.flight_number}: ${flight.price} {'(within budget)' if within_budget else '(over budget)'}\n"
-
-    cheapest = matching_flights[0]
-    analysis += f"\nCheapest option: {cheapest.flight_number} for ${cheapest.price}"
-
-    if (
-        ctx.deps.auto_purchase
-        and cheapest.price <= ctx.deps.purchase_rules.auto_purchase_threshold
-    ):
-        analysis += f"\nRECOMMENDATION: Purchase {cheapest.flight_number} - it's within budget and the cheapest available."
-
-    return analysis
+        flight_date = date and _parse_date(date[1])
+        if not (price and origin and destination and flight_date):
+            unread.append(block[0])
+            continue
+        flights.append(
+            FlightDetails(
+                flight_number=block["number"],
+                price=int(price[1].replace(",", "")),
+                origin=origin[1],
+                destination=destination[1],
+                date=flight_date,
+            )
+        )
+    return flights, unread
+
+
+async def extract_flights(
+    text: str, usage: RunUsage, usage_limits: UsageLimits
+) -> list[FlightDetails]:
+    """
+    Flights of a listing page. Only the entries the regular expressions cannot
+    read go to the model, or the whole page when it has no entries at all.
+    """
+    flights, unread = parse_flights(text)
+    if not flights and not unread:
+        unread = [text]
+    if unread:
+        result = await extraction_agent.run(
+            "\n\n".join(unread), usage=usage, usage_limits=usage_limits
+        )
+        flights += result.output
+    logfire.info(
+        "found {flight_count} flights, {unread_count} read by the model",
+        flight_count=len(flights),
+        unread_count=len(unread),
+    )
+    return flights
+
+
+def matching_flights(flights: list[FlightDetails], deps: Deps) -> list[FlightDetails]:
+    """Flights on the requested route and date within budget, cheapest first."""
+    return sorted(
+        (
+            f
+            for f in flights
+            if f.origin == deps.req_origin
+            and f.destination == deps.req_destination
+            and f.date == deps.req_date
+            and f.price <= deps.purchase_rules.max_budget
+        ),
+        key=lambda f: f.price,
+    )
 
 
-@search_agent.tool
-async def select_seat_automatically(
-    ctx: RunContext[Deps], flight: FlightDetails
+async def select_seat(
+    flight: FlightDetails, usage: RunUsage, usage_limits: UsageLimits
 ) -> SeatPreference:
-    """Automatically select the best available seat for the flight."""
     result = await seat_selection_agent.run(
         f"Select the best seat for flight {flight.flight_number}",
         deps=flight,
-        usage=ctx.usage,
+        usage=usage,
+        usage_limits=usage_limits,
     )
     return result.output
 
 
+async def prepare_candidates(
+    deps: Deps, usage: RunUsage, usage_limits: UsageLimits
+) -> list[Candidate]:
+    """
+    Everything the decision needs that does not need judgement: flights are
+    parsed and filtered in code, and seats for the cheapest few are chosen
+    concurrently. A flight whose seat could not be chosen is left out; when
+    that is every flight, the first error is raised.
+    """
+    flights = matching_flights(
+        await extract_flights(deps.web_page_text, usage, usage_limits), deps
+    )
+    flights = flights[:SEAT_CANDIDATES]
+    seats = await asyncio.gather(
+        *(select_seat(flight, usage, usage_limits) for flight in flights),
+        return_exceptions=True,
+    )
+    candidates = []
+    for flight, seat in zip(flights, seats, strict=True):
+        if isinstance(seat, BaseException):
+            logfire.warn(
+                "seat selection for {flight_number} failed: {error}",
+                flight_number=flight.flight_number,
+                error=str(seat),
+            )
+            continue
+        candidates.append(
+            Candidate(
+                flight=flight,
+                seat=seat,
+                auto_purchase=deps.auto_purchase
+                and flight.price <= deps.purchase_rules.auto_purchase_threshold,
+            )
+        )
+    if flights and not candidates:
+        raise seats[0]
+    return candidates
+
+
+def describe_candidates(candidates: list[Candidate]) -> str:
+    lines = []
+    for candidate in candidates:
+        flight, seat = candidate.flight, candidate.seat
+        lines.append(
+            f"- {flight.flight_number}: ${flight.price}, {flight.origin} → "
+            f"{flight.destination} on {flight.date}, seat {seat.row}{seat.seat} "
+            f"({seat.reasoning})"
+            + (
+                " - under the auto-purchase threshold"
+                if candidate.auto_purchase
+                else ""
+            )
+        )
+    return "\n".join(lines)
+
+
 @search_agent.tool
-async def purchase_flight_and_seat(
-    ctx: RunContext[Deps], flight: FlightDetails, seat: SeatPreference
-) -> str:
-    """Execute the flight and seat purchase."""
+async def purchase_flight_and_seat(ctx: RunContext[Deps], flight_number: str) -> str:
+    """Execute the purchase of one of the candidate flights with its chosen seat."""
+    candidate = next(
+        (c for c in ctx.deps.candidates if c.flight.flight_number == flight_number),
+        None,
+    )
+    if candidate is None:
+        raise ModelRetry(f"{flight_number} is not one of the candidate flights")
+    flight, seat = candidate.flight, candidate.seat
+
     # In a real implementation, this would call actual booking APIs
     purchase_details = {
         "flight": flight.flight_number,
@@ -191,6 +304,34 @@ async def purchase_flight_and_seat(
     )
 
 
+async def find_and_purchase(
+    deps: Deps, usage: RunUsage, usage_limits: UsageLimits = AGENT_LIMITS["flights"]
+) -> PurchaseDecision:
+    """
+    usage is shared by every agent run of the search, so usage_limits, checked
+    on each of them, caps the search as a whole.
+    """
+    deps.candidates = await prepare_candidates(deps, usage, usage_limits)
+    if not deps.candidates:
+        return PurchaseDecision(
+            should_purchase=False,
+            reasoning=(
+                f"No flight from {deps.req_origin} to {deps.req_destination} on "
+                f"{deps.req_date} is within the ${deps.purchase_rules.max_budget} budget."
+            ),
+        )
+
+    result = await search_agent.run(
+        f"Find and potentially purchase a flight from {deps.req_origin} to {deps.req_destination} on {deps.req_date}. "
+        f"My budget is ${deps.purchase_rules.max_budget}. If you find a good deal within budget, go ahead and buy it!\n\n"
+        f"Candidate flights:\n{describe_candidates(deps.candidates)}",
+        deps=deps,
+        usage=usage,
+        usage_limits=usage_limits,
+    )
+    return result.output
+
+
 # Sample flight data (same as original)
 flights_web_page = """
 1. Flight SFO-AK123
@@ -230,7 +371,6 @@ async def main():
         purchase_rules=PurchaseRules(max_budget=400, auto_purchase_threshold=350),
     )
 
-    usage_limits = UsageLimits(request_limit=15)
     usage = RunUsage()
 
     print(
@@ -240,15 +380,7 @@ async def main():
     print(f"🤖 Auto-purchase: {'Enabled' if deps.auto_purchase else 'Disabled'}")
     print("-" * 50)
 
-    result = await search_agent.run(
-        f"Find and potentially purchase a flight from {deps.req_origin} to {deps.req_destination} on {deps.req_date}. "
-        f"My budget is ${deps.purchase_rules.max_budget}. If you find a good deal within budget, go ahead and buy it!",
-        deps=deps,
-        usage=usage,
-        usage_limits=usage_limits,
-    )
-
-    decision = result.output
+    decision = await find_and_purchase(deps, usage)
     print(
         f"\n🤔 Agent Decision: {'PURCHASE' if decision.should_purchase else 'NO PURCHASE'}"
     )
@@ -261,6 +393,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+Dashboard insight refresh. All data sources are fetched at once, then several
+insights are written in parallel from that data, each in a single model request
+without tool calls.
+
+    python -m src.insight_pipeline
+"""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from itertools import cycle, islice
+
+from pydantic_ai import Agent, RunUsage, UsageLimits
+from supabase import AsyncClient
+
+from src import market_data, market_store, weather_service
+from src.config import settings
+from src.db import create_supabase
+from src.insight_agent import SYSTEM_PROMPT, InsightContent
+from src.usage_limits import AGENT_LIMITS
+
+logger = logging.getLogger(__name__)
+
+# Brewery site used when the caller gives no location
+LATITUDE = 51.51
+LONGITUDE = 0.12
+TICKER = "ZW=F"
+
+FOCUS_AREAS = [
+    "supply chain and logistics",
+    "commodity market movements",
+    "production and weather risk",
+    "spent grain allocation and sustainability",
+]
+
+
+class InsightGenerationError(Exception):
+    pass
+
+
+insight_writer = Agent(
+    "openai:gpt-4o",
+    output_type=InsightContent,
+    system_prompt=SYSTEM_PROMPT,
+)
+
+
+async def gather_context(
+    latitude: float = LATITUDE, longitude: float = LONGITUDE, ticker: str = TICKER
+) -> str:
+    """Fetches every data source concurrently; a failed source is marked unavailable."""
+    today = date.today()
+    weather, summary, history = await asyncio.gather(
+        weather_service.current_weather(latitude, longitude),
+        market_data.financial_summary(ticker),
+        market_store.historical_summary(
+            ticker, (today - timedelta(days=30)).isoformat(), today.isoformat()
+        ),
+        return_exceptions=True,
+    )
+
+    if not isinstance(weather, Exception):
+        weather = weather.describe()
+
+    lines = []
+    for label, value in [
+        ("Weather at the brewery", weather),
+        ("Wheat futures, last 3 days", summary),
+        ("Wheat futures, last 30 days", history),
+    ]:
+        if isinstance(value, Exception):
+            logger.warning(f"{label} unavailable: {value}")
+            value = "unavailable"
+        lines.append(f"{label}: {value}")
+    return "\n".join(lines)
+
+
+async def generate_insights(
+    context: str,
+    count: int = settings.INSIGHT_COUNT,
+    concurrency: int = settings.INSIGHT_CONCURRENCY,
+    usage: RunUsage | None = None,
+    usage_limits: UsageLimits = AGENT_LIMITS["insights"],
+) -> list[InsightContent]:
+    """
+    Writes count insights in parallel, at most concurrency model calls at once.
+    usage_limits applies to each generation, so a daily budget must already be
+    split count ways; usage, when given, collects the usage of all of them.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(focus: str) -> InsightContent:
+        run_usage = RunUsage()
+        try:
+            async with semaphore:
+                result = await insight_writer.run(
+                    f"Current data:\n{context}\n\nWrite one insight focused on {focus}.",
+                    usage=run_usage,
+                    usage_limits=usage_limits,
+                )
+            return result.output
+        finally:
+            if usage is not None:
+                usage.incr(run_usage)
+
+    results = await asyncio.gather(
+        *(generate(focus) for focus in islice(cycle(FOCUS_AREAS), count)),
+        return_exceptions=True,
+    )
+    insights = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Insight generation failed: {result}")
+        else:
+            insights.append(result)
+    return insights
+
+
+async def refresh_insights(
+    session: AsyncClient,
+    count: int = settings.INSIGHT_COUNT,
+    usage: RunUsage | None = None,
+    usage_limits: UsageLimits = AGENT_LIMITS["insights"],
+):
+    """
+    Generates a fresh set of insights and stores them in the insights table.
+    Raises InsightGenerationError when not a single insight could be written.
+    """
+    context = await gather_context()
+    insights = await generate_insights(
+        context, count, usage=usage, usage_limits=usage_limits
+    )
+    if not insights:
+        raise InsightGenerationError(f"All {count} insight generations failed")
+    response = await (
+        session.table("insights")
+        .insert([insight.model_dump() for insight in insights])
+        .execute()
+    )
+    return response.data
+
+
+async def main():
+    rows = await refresh_insights(await create_supabase())
+    for row in rows:
+        print(row)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
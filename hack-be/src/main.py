@@ -1,8 +1,9 @@
 from dataclasses import dataclass
 
-import openmeteo_requests
 from pydantic import BaseModel
-from pydantic_ai import Agent, RunContext
+from pydantic_ai import Agent, ModelRetry, RunContext
+
+from src import weather_service
 
 
 @dataclass
@@ -33,27 +34,12 @@ async def weather_checker(
     ctx: RunContext[None], latitude: float, longitude: float
 ) -> str:
     """To check weather for a given location."""
-    openmeteo = openmeteo_requests.AsyncClient()
     print("Fetching weather data...")
-    print(f"Latitude: {latitude}, Longitude: {longitude}")
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "hourly": ["temperature_2m", "precipitation", "wind_speed_10m"],
-        "current": ["temperature_2m", "relative_humidity_2m"],
-    }
-    responses = await openmeteo.weather_api(url, params=params)
-    for each_item in responses:
-        print(each_item.UtcOffsetSeconds(), each_item.Elevation())
-        current = each_item.Current()
-        current_temperature_2m = current.Variables(0).Value()  # type: ignore
-        current_relative_humidity_2m = current.Variables(1).Value()  # type: ignore
-
-        print(f"Current time: {current.Time()}")  # type: ignore
-        print(f"Current temperature_2m: {current_temperature_2m}")
-        print(f"Current relative_humidity_2m: {current_relative_humidity_2m}")
-    return f"The current temperature is {current_temperature_2m}°C with a humidity of {current_relative_humidity_2m}%."
+    try:
+        weather = await weather_service.current_weather(latitude, longitude)
+    except weather_service.WeatherError as e:
+        raise ModelRetry(str(e))
+    return weather.describe()
 
 
 result = weather_agent.run_sync("What is the weather like in Ulaanbaatar?", deps=None)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+from src.batching import MicroBatcher
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# yfinance is blocking; a small dedicated pool keeps it off the event loop and
+# caps how many slow Yahoo calls can pile up behind a timeout
+_executor = ThreadPoolExecutor(
+    max_workers=settings.MARKET_DATA_WORKERS, thread_name_prefix="market-data"
+)
+
+
+class MarketDataError(Exception):
+    pass
+
+
+class NoMarketData(MarketDataError):
+    pass
+
+
+def _download(tickers: list[str], params: dict) -> dict[str, pd.DataFrame | Exception]:
+    frame = yf.download(
+        tickers,
+        group_by="ticker",
+        auto_adjust=True,
+        progress=False,
+        threads=False,
+        **params,
+    )
+    results = {}
+    for ticker in tickers:
+        found = frame is not None and ticker in frame.columns.get_level_values(0)
+        history = frame[ticker].dropna(how="all") if found else None
+        if history is None or history.empty:
+            results[ticker] = NoMarketData(f"No market data for {ticker}")
+        else:
+            results[ticker] = history
+    return results
+
+
+async def _fetch_many(group: tuple, tickers: list[str]) -> dict:
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_executor, _download, tickers, dict(group)),
+            settings.MARKET_DATA_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        raise MarketDataError("Market data request timed out")
+
+
+# Tickers asked for with the same parameters at about the same time share one
+# yf.download call
+_batcher = MicroBatcher(_fetch_many)
+
+
+async def history(ticker: str, **params) -> pd.DataFrame:
+    """OHLCV bars for ticker, params as for yf.download (period, start, interval...)."""
+    group = tuple(sorted((key, value) for key, value in params.items() if value))
+    return await _batcher.submit(group, ticker)
+
+
+async def financial_summary(ticker: str) -> dict:
+    hist = await history(ticker, period="3d", interval="30m")
+    if len(hist) < 2:
+        raise MarketDataError(f"Not enough market data for {ticker}")
+
+    # Calculate key metrics
+    latest = hist.iloc[-1]
+    previous = hist.iloc[-2]
+    daily_change = ((latest["Close"] - previous["Close"]) / previous["Close"]) * 100
+
+    return {
+        "current_price": round(float(latest["Close"]), 2),
+        "daily_change_pct": round(float(daily_change), 2),
+        "3d_high": round(float(hist["High"].max()), 2),
+        "3d_low": round(float(hist["Low"].min()), 2),
+        "avg_volume": int(hist["Volume"].mean()),
+        "last_updated": latest.name.strftime("%Y-%m-%d %H:%M"),  # type: ignore
+    }
@@ -0,0 +1,207 @@
+import asyncio
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+from pydantic_ai import ModelRetry
+
+from src import market_data
+from src.config import settings
+
+INTERVAL_SECONDS = {"30m": 30 * 60, "1h": 60 * 60, "1d": 24 * 60 * 60}
+# How far back Yahoo serves intraday bars (60 and 730 days), less a day so a
+# span right at the edge is not refused; older ranges are never requested
+HISTORY_SECONDS = {"30m": 59 * 24 * 60 * 60, "1h": 729 * 24 * 60 * 60}
+
+# Bumped with every change to SCHEMA; a store at an older version gets SCHEMA
+# applied once, tracked in PRAGMA user_version
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, interval, ts)
+);
+-- Disjoint time ranges already asked of Yahoo, bars or not: weekends and
+-- holidays have none and are not asked again. Replaces the single range per
+-- ticker of version 1.
+DROP TABLE IF EXISTS coverage;
+CREATE TABLE IF NOT EXISTS covered (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    PRIMARY KEY (ticker, interval, start)
+);
+"""
+
+
+@contextmanager
+def _connect():
+    connection = sqlite3.connect(settings.MARKET_STORE_PATH)
+    try:
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def _coverage(ticker: str, interval: str, start: int, end: int) -> list[tuple]:
+    """Covered ranges overlapping [start, end), in order."""
+    with _connect() as connection:
+        return connection.execute(
+            """
+            SELECT start, "end" FROM covered
+            WHERE ticker = ? AND interval = ? AND "end" > ? AND start < ?
+            ORDER BY start
+            """,
+            (ticker, interval, start, end),
+        ).fetchall()
+
+
+def _save(ticker: str, interval: str, rows: list[tuple], start: int, end: int):
+    with _connect() as connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(ticker, interval, *row) for row in rows],
+        )
+        # Merged with the ranges it overlaps or touches, keeping them disjoint
+        where = 'ticker = ? AND interval = ? AND start <= ? AND "end" >= ?'
+        merged_start, merged_end = connection.execute(
+            f'SELECT min(start), max("end") FROM covered WHERE {where}',
+            (ticker, interval, end, start),
+        ).fetchone()
+        if merged_start is not None:
+            connection.execute(
+                f"DELETE FROM covered WHERE {where}", (ticker, interval, end, start)
+            )
+            start, end = min(start, merged_start), max(end, merged_end)
+        connection.execute(
+            "INSERT INTO covered VALUES (?, ?, ?, ?)", (ticker, interval, start, end)
+        )
+
+
+def _load(ticker: str, interval: str, start: int, end: int) -> np.ndarray:
+    """Bars in [start, end) as rows of ts, open, high, low, close, volume."""
+    with _connect() as connection:
+        rows = connection.execute(
+            """
+            SELECT ts, open, high, low, close, volume FROM bars
+            WHERE ticker = ? AND interval = ? AND ts >= ? AND ts < ?
+            ORDER BY ts
+            """,
+            (ticker, interval, start, end),
+        ).fetchall()
+    return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+
+def _missing(covered: list[tuple], start: int, end: int) -> list[tuple[int, int]]:
+    """The gaps of [start, end) between the covered ranges."""
+    spans = []
+    for covered_start, covered_end in covered:
+        if covered_start > start:
+            spans.append((start, min(covered_start, end)))
+        start = max(start, covered_end)
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+
+async def _download(ticker: str, interval: str, start: int, end: int) -> None:
+    def day(ts):
+        return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+    try:
+        hist = await market_data.history(
+            ticker, start=day(start), end=day(end + 24 * 60 * 60), interval=interval
+        )
+        stamps = hist.index.as_unit("s").asi8
+        values = hist[["Open", "High", "Low", "Close", "Volume"]].to_numpy()
+        keep = (stamps >= start) & (stamps < end) & ~np.isnan(values[:, 3])
+        rows = [
+            (int(ts), *map(float, row))
+            for ts, row in zip(stamps[keep], values[keep], strict=True)
+        ]
+    except market_data.NoMarketData:
+        # No bars in the span; still record it as asked so it is not fetched again
+        rows = []
+    await asyncio.to_thread(_save, ticker, interval, rows, start, end)
+
+
+async def bars(ticker: str, start_date: str, end_date: str, interval: str = "30m"):
+    """
+    Bars for ticker between the dates (end exclusive), downloading only the
+    ranges the store has not seen. The bar still forming is never marked as
+    covered, so it is fetched again once complete.
+    """
+    try:
+        start, end = (
+            int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+            for value in (start_date, end_date)
+        )
+    except ValueError as e:
+        raise ModelRetry(f"Dates must be in YYYY-MM-DD format: {e}") from e
+    now = int(time.time())
+    end = min(end, now - INTERVAL_SECONDS[interval])
+    # Bars older than the provider keeps are served from the store only
+    fetch_start = max(start, now - HISTORY_SECONDS.get(interval, now))
+
+    if not settings.MARKET_DATA_OFFLINE and end > fetch_start:
+        covered = await asyncio.to_thread(_coverage, ticker, interval, fetch_start, end)
+        for span_start, span_end in _missing(covered, fetch_start, end):
+            await _download(ticker, interval, span_start, span_end)
+
+    return await asyncio.to_thread(_load, ticker, interval, start, end)
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    if len(values) < window:
+        return np.array([])
+    cumulative = np.cumsum(np.insert(values, 0, 0.0))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def linear_trend(timestamps: np.ndarray, values: np.ndarray) -> tuple[float, float]:
+    """Least squares slope per second, and the fitted value at the last timestamp."""
+    slope, intercept = np.polyfit(timestamps - timestamps[-1], values, 1)
+    return slope, intercept
+
+
+async def historical_summary(
+    ticker: str, start_date: str, end_date: str, window: int = 20
+) -> dict:
+    data = await bars(ticker, start_date, end_date)
+    if len(data) == 0:
+        raise market_data.MarketDataError(
+            f"No market data for {ticker} between {start_date} and {end_date}"
+        )
+    timestamps, _, high, low, close, _ = data.T
+
+    summary = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "data_points": len(data),
+        "highest_price": round(float(high.max()), 2),
+        "lowest_price": round(float(low.min()), 2),
+        "average_close": round(float(close.mean()), 2),
+        "last_close": round(float(close[-1]), 2),
+    }
+    average = moving_average(close, window)
+    if len(average):
+        summary[f"moving_average_{window}"] = round(float(average[-1]), 2)
+    if len(close) > 1:
+        returns = np.diff(np.log(close))
+        summary["volatility_pct"] = round(float(returns.std() * 100), 3)
+        slope, fitted = linear_trend(timestamps, close)
+        day = 24 * 60 * 60
+        summary["trend_per_day"] = round(float(slope * day), 3)
+        summary["forecast_next_day"] = round(float(fitted + slope * day), 2)
+    return summary
@@ -0,0 +1,461 @@
+"""
+Record and replay of agent runs. Recording runs a script's main() against the
+real models and APIs and writes every model response and cached tool call to a
+JSON trace. Replaying runs the same main() with each agent answered from the
+trace by a FunctionModel and each cached tool by its recorded result, so it
+needs no network and times the orchestration alone.
+
+    python -m src.replay record src/flight-agent.py traces/flights.json
+    python -m src.replay bench src/flight-agent.py traces/flights.json --runs 20
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+import re
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, asynccontextmanager, contextmanager, redirect_stdout
+from pathlib import Path
+from types import ModuleType
+
+from pydantic_ai import Agent, ModelRetry
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ThinkingPart,
+    ToolCallPart,
+)
+from pydantic_ai.models.function import (
+    AgentInfo,
+    DeltaThinkingPart,
+    DeltaToolCall,
+    FunctionModel,
+)
+from pydantic_ai.models.wrapper import WrapperModel
+
+from src.tool_cache import tool_interceptor
+
+CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+class ReplayError(Exception):
+    pass
+
+
+def load_module(target: str) -> ModuleType:
+    """Imports a module by dotted name or by file path, e.g. src/flight-agent.py."""
+    if not target.endswith(".py"):
+        return importlib.import_module(target)
+    path = Path(target)
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def agents(module: ModuleType) -> dict[str, Agent]:
+    return {
+        name: value for name, value in vars(module).items() if isinstance(value, Agent)
+    }
+
+
+def fingerprint(messages: list[ModelMessage]) -> str:
+    """Identifies a model request by the parts of its last message."""
+    request = next((m for m in reversed(messages) if isinstance(m, ModelRequest)), None)
+    parts = [
+        (
+            part.part_kind,
+            getattr(part, "tool_name", None),
+            getattr(part, "content", None),
+        )
+        for part in (request.parts if request else [])
+    ]
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def argument_key(name: str, arguments: dict) -> str:
+    return f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class Trace:
+    """Model calls per agent and cached tool calls, in the order they happened."""
+
+    def __init__(self, model_calls: list[dict] = None, tool_calls: list[dict] = None):
+        self.model_calls = model_calls or []
+        self.tool_calls = tool_calls or []
+
+    def add_model_call(
+        self,
+        agent: str,
+        messages: list[ModelMessage],
+        response: ModelResponse,
+        duration: float,
+        streamed: bool,
+    ) -> None:
+        self.model_calls.append(
+            {
+                "agent": agent,
+                "fingerprint": fingerprint(messages),
+                "streamed": streamed,
+                "duration": duration,
+                "response": ModelMessagesTypeAdapter.dump_python(
+                    [response], mode="json"
+                )[0],
+            }
+        )
+
+    def add_tool_call(
+        self,
+        name: str,
+        arguments: dict,
+        duration: float,
+        result=None,
+        error: Exception | None = None,
+    ) -> None:
+        self.tool_calls.append(
+            {
+                "tool": name,
+                "arguments": arguments,
+                "duration": duration,
+                "result": result,
+                "error": None if error is None else str(error),
+                "retry": isinstance(error, ModelRetry),
+            }
+        )
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(
+            json.dumps(
+                {"model_calls": self.model_calls, "tool_calls": self.tool_calls},
+                indent=2,
+                default=str,
+            )
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Trace":
+        data = json.loads(Path(path).read_text())
+        return cls(data["model_calls"], data["tool_calls"])
+
+
+class RecordingModel(WrapperModel):
+    """Passes requests to the real model and adds each response to the trace."""
+
+    def __init__(self, wrapped, agent: str, trace: Trace):
+        super().__init__(wrapped)
+        self.agent = agent
+        self.trace = trace
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        start = time.perf_counter()
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        self.trace.add_model_call(
+            self.agent, messages, response, time.perf_counter() - start, False
+        )
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self, messages, model_settings, model_request_parameters, run_context=None
+    ):
+        start = time.perf_counter()
+        async with super().request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        self.trace.add_model_call(
+            self.agent, messages, stream.get(), time.perf_counter() - start, True
+        )
+
+
+class ToolRecorder:
+    """Tool interceptor that calls the real tool and adds the call to the trace."""
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+
+    async def call(self, name, arguments, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await function(*args, **kwargs)
+        except Exception as e:
+            self.trace.add_tool_call(
+                name, arguments, time.perf_counter() - start, error=e
+            )
+            raise
+        self.trace.add_tool_call(name, arguments, time.perf_counter() - start, result)
+        return result
+
+    def call_sync(self, name, arguments, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            self.trace.add_tool_call(
+                name, arguments, time.perf_counter() - start, error=e
+            )
+            raise
+        self.trace.add_tool_call(name, arguments, time.perf_counter() - start, result)
+        return result
+
+
+def _chunks(response: ModelResponse):
+    """The response as the deltas a FunctionModel stream function yields."""
+    for index, part in enumerate(response.parts):
+        if isinstance(part, TextPart):
+            yield from CHUNK.findall(part.content)
+        elif isinstance(part, ToolCallPart):
+            yield {
+                index: DeltaToolCall(
+                    part.tool_name,
+                    part.args_as_json_str(),
+                    tool_call_id=part.tool_call_id,
+                )
+            }
+        elif isinstance(part, ThinkingPart):
+            yield {index: DeltaThinkingPart(content=part.content)}
+
+
+class Replay:
+    """
+    Answers model requests and cached tool calls from a trace. Responses are
+    matched to requests by fingerprint and otherwise taken in recorded order,
+    so concurrent runs of one agent still get their own answers. With latency
+    set, recorded model and tool durations are slept through as well.
+    """
+
+    def __init__(self, trace: Trace, latency: bool = False):
+        self.latency = latency
+        self.responses: dict[str, list[dict]] = defaultdict(list)
+        for call in trace.model_calls:
+            self.responses[call["agent"]].append(
+                {
+                    **call,
+                    "response": ModelMessagesTypeAdapter.validate_python(
+                        [call["response"]]
+                    )[0],
+                }
+            )
+        self.tools: dict[str, deque] = defaultdict(deque)
+        for call in trace.tool_calls:
+            self.tools[argument_key(call["tool"], call["arguments"])].append(call)
+        self.model_requests = 0
+        self.tool_calls = 0
+        self.stream_chunks = 0
+        self.stream_characters = 0
+        self.stream_seconds = 0.0
+
+    def _response(self, agent: str, messages: list[ModelMessage]) -> dict:
+        pending = self.responses[agent]
+        if not pending:
+            raise ReplayError(f"No recorded response left for {agent}")
+        key = fingerprint(messages)
+        index = next((i for i, c in enumerate(pending) if c["fingerprint"] == key), 0)
+        self.model_requests += 1
+        return pending.pop(index)
+
+    def model(self, agent: str) -> FunctionModel:
+        async def respond(messages: list[ModelMessage], _info: AgentInfo):
+            call = self._response(agent, messages)
+            if self.latency:
+                await asyncio.sleep(call["duration"])
+            return call["response"]
+
+        async def stream(messages: list[ModelMessage], _info: AgentInfo):
+            call = self._response(agent, messages)
+            if self.latency:
+                await asyncio.sleep(call["duration"])
+            start = time.perf_counter()
+            chunks = 0
+            for chunk in _chunks(call["response"]):
+                chunks += 1
+                if isinstance(chunk, str):
+                    self.stream_characters += len(chunk)
+                yield chunk
+            if not chunks:
+                yield ""
+            self.stream_chunks += chunks
+            self.stream_seconds += time.perf_counter() - start
+
+        return FunctionModel(
+            respond, stream_function=stream, model_name=f"replay:{agent}"
+        )
+
+    def _tool_call(self, name: str, arguments: dict) -> dict:
+        recorded = self.tools.get(argument_key(name, arguments))
+        if not recorded:
+            raise ReplayError(f"No recorded call of {name} with {arguments}")
+        self.tool_calls += 1
+        # The last recording answers any further identical calls
+        return recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+    @staticmethod
+    def _result(call: dict):
+        if call["retry"]:
+            raise ModelRetry(call["error"])
+        if call["error"] is not None:
+            raise ReplayError(f"{call['tool']} failed when recorded: {call['error']}")
+        return call["result"]
+
+    async def call(self, name, arguments, function, *args, **kwargs):
+        call = self._tool_call(name, arguments)
+        if self.latency:
+            await asyncio.sleep(call["duration"])
+        return self._result(call)
+
+    def call_sync(self, name, arguments, function, *args, **kwargs):
+        call = self._tool_call(name, arguments)
+        if self.latency:
+            time.sleep(call["duration"])
+        return self._result(call)
+
+
+@contextmanager
+def _intercept(interceptor):
+    token = tool_interceptor.set(interceptor)
+    try:
+        yield interceptor
+    finally:
+        tool_interceptor.reset(token)
+
+
+@contextmanager
+def recording(module: ModuleType, trace: Trace):
+    """Records every agent of module, and all cached tools, into trace."""
+    with ExitStack() as stack:
+        for name, agent in agents(module).items():
+            stack.enter_context(
+                agent.override(model=RecordingModel(agent.model, name, trace))
+            )
+        stack.enter_context(_intercept(ToolRecorder(trace)))
+        yield trace
+
+
+@contextmanager
+def replaying(module: ModuleType, trace: Trace, latency: bool = False):
+    """Answers every agent of module, and all cached tools, from trace."""
+    replay = Replay(trace, latency)
+    with ExitStack() as stack:
+        for name, agent in agents(module).items():
+            stack.enter_context(agent.override(model=replay.model(name)))
+        stack.enter_context(_intercept(replay))
+        yield replay
+
+
+async def record(module: ModuleType, path: str) -> Trace:
+    trace = Trace()
+    try:
+        with recording(module, trace):
+            await module.main()
+    finally:
+        trace.save(path)
+    return trace
+
+
+def _stats(values: list[float]) -> dict:
+    return {
+        "p50": round(percentile(values, 0.5), 6),
+        "p95": round(percentile(values, 0.95), 6),
+        "max": round(max(values, default=0.0), 6),
+    }
+
+
+async def benchmark(
+    module: ModuleType, trace: Trace, runs: int = 20, latency: bool = False
+) -> dict:
+    """
+    Replays module.main() runs times. Without latency the wall time is the
+    orchestration overhead alone; the recorded latencies are reported per tool
+    and per agent next to it.
+    """
+    walls, requests, chunks, characters, stream_seconds = [], 0, 0, 0, 0.0
+    # One unmeasured run first, so schema building and imports are not timed
+    with replaying(module, trace), redirect_stdout(io.StringIO()):
+        await module.main()
+    for _ in range(runs):
+        with replaying(module, trace, latency) as replay:
+            with redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                await module.main()
+                walls.append(time.perf_counter() - start)
+        requests += replay.model_requests
+        chunks += replay.stream_chunks
+        characters += replay.stream_characters
+        stream_seconds += replay.stream_seconds
+
+    recorded_models: dict[str, list[float]] = defaultdict(list)
+    for call in trace.model_calls:
+        recorded_models[call["agent"]].append(call["duration"])
+    recorded_tools: dict[str, list[float]] = defaultdict(list)
+    for call in trace.tool_calls:
+        recorded_tools[call["tool"]].append(call["duration"])
+
+    return {
+        "runs": runs,
+        "latency": latency,
+        "wall_seconds": _stats(walls),
+        "model_requests_per_run": requests / runs,
+        "stream": {
+            "chunks_per_second": round(chunks / stream_seconds, 1)
+            if stream_seconds
+            else None,
+            "characters_per_second": round(characters / stream_seconds, 1)
+            if stream_seconds
+            else None,
+        },
+        "recorded_model_seconds": {
+            agent: _stats(values) for agent, values in recorded_models.items()
+        },
+        "recorded_tool_seconds": {
+            tool: _stats(values) for tool, values in recorded_tools.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay agent runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="run main() live and record")
+    record_parser.add_argument("script")
+    record_parser.add_argument("trace")
+    bench_parser = commands.add_parser("bench", help="replay main() from a trace")
+    bench_parser.add_argument("script")
+    bench_parser.add_argument("trace")
+    bench_parser.add_argument("--runs", type=int, default=20)
+    bench_parser.add_argument(
+        "--latency", action="store_true", help="sleep through recorded latencies"
+    )
+    args = parser.parse_args()
+
+    module = load_module(args.script)
+    if args.command == "record":
+        trace = asyncio.run(record(module, args.trace))
+        print(
+            f"Recorded {len(trace.model_calls)} model calls and "
+            f"{len(trace.tool_calls)} tool calls to {args.trace}"
+        )
+    else:
+        report = asyncio.run(
+            benchmark(module, Trace.load(args.trace), args.runs, args.latency)
+        )
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+from contextvars import ContextVar
+
+import redis
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds a tool result stays valid, per tool name
+TOOL_TTLS: dict[str, int] = {
+    "get_weather": 60 * 10,
+    "get_financial_summary": 60 * 30,
+    "get_historical_prices": 60 * 30,
+}
+DEFAULT_TTL = 60 * 5
+
+# Set by src.replay to record or replay tool I/O. An interceptor sees every
+# call of a cached tool, uncached, as call(name, arguments, function, ...) or
+# call_sync(...) and returns the tool result.
+tool_interceptor: ContextVar = ContextVar("tool_interceptor", default=None)
+
+
+def normalise_arguments(signature: inspect.Signature, args, kwargs) -> dict:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {}
+    for name, value in sorted(bound.arguments.items()):
+        # 1, 1.0 and 1.00001 are the same coordinate to a weather API
+        if isinstance(value, int | float) and not isinstance(value, bool):
+            value = round(float(value), 4)
+        arguments[name] = value
+    return arguments
+
+
+class ToolCache:
+    """
+    Tool results cached in process per tool TTL and, when TOOL_CACHE_REDIS_URL
+    is set, shared through Redis. Concurrent calls with the same arguments wait
+    for the first one instead of all hitting the upstream API.
+    """
+
+    def __init__(self, redis_url: str = "", maxsize: int = 512):
+        self.redis_url = redis_url
+        self.maxsize = maxsize
+        self.caches: dict[str, TTLCache] = {}
+        self.lock = threading.RLock()
+        self.inflight: dict[str, asyncio.Task] = {}
+        self.inflight_sync: dict[str, threading.Event] = {}
+        self._redis = None
+        self._sync_redis = None
+
+    def key(self, name: str, arguments: dict) -> str:
+        digest = hashlib.sha256(
+            json.dumps(arguments, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"tool:{name}:{digest}"
+
+    def _cache(self, name: str) -> TTLCache:
+        with self.lock:
+            if name not in self.caches:
+                ttl = TOOL_TTLS.get(name, DEFAULT_TTL)
+                self.caches[name] = TTLCache(maxsize=self.maxsize, ttl=ttl)
+            return self.caches[name]
+
+    def get_local(self, name: str, key: str):
+        with self.lock:
+            return self._cache(name).get(key)
+
+    def set_local(self, name: str, key: str, value) -> None:
+        cache = self._cache(name)
+        with self.lock:
+            cache[key] = value
+
+    def invalidate(self, name: str | None = None) -> None:
+        with self.lock:
+            for tool, cache in self.caches.items():
+                if name is None or tool == name:
+                    cache.clear()
+
+    async def get_shared(self, key: str):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        try:
+            value = await self._redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Tool cache read failed: {e}")
+            return None
+        return None if value is None else json.loads(value)
+
+    async def set_shared(self, name: str, key: str, value) -> None:
+        if not self.redis_url:
+            return
+        try:
+            await self._redis.set(
+                key, json.dumps(value), ex=TOOL_TTLS.get(name, DEFAULT_TTL)
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Tool cache write failed: {e}")
+
+    def get_shared_sync(self, key: str):
+        if not self.redis_url:
+            return None
+        if self._sync_redis is None:
+            self._sync_redis = redis.Redis.from_url(
+                self.redis_url, decode_responses=True
+            )
+        try:
+            value = self._sync_redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Tool cache read failed: {e}")
+            return None
+        return None if value is None else json.loads(value)
+
+    def set_shared_sync(self, name: str, key: str, value) -> None:
+        if not self.redis_url:
+            return
+        try:
+            self._sync_redis.set(
+                key, json.dumps(value), ex=TOOL_TTLS.get(name, DEFAULT_TTL)
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Tool cache write failed: {e}")
+
+    async def _fetch(self, name: str, key: str, function, *args, **kwargs):
+        try:
+            value = await self.get_shared(key)
+            if value is None:
+                value = await function(*args, **kwargs)
+                await self.set_shared(name, key, value)
+            self.set_local(name, key, value)
+            return value
+        finally:
+            del self.inflight[key]
+
+    async def call(self, name: str, key: str, function, *args, **kwargs):
+        value = self.get_local(name, key)
+        if value is not None:
+            return value
+
+        # Single flight: the fetch runs in a task of its own that every caller
+        # awaits through a shield, so a cancelled caller (a closed chat) stops
+        # waiting without cancelling the fetch the other callers wait for
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch(name, key, function, *args, **kwargs)
+            )
+            self.inflight[key] = task
+            # Everyone may have stopped waiting, do not log "exception never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    def call_sync(self, name: str, key: str, function, *args, **kwargs):
+        while True:
+            value = self.get_local(name, key)
+            if value is not None:
+                return value
+            with self.lock:
+                event = self.inflight_sync.get(key)
+                if event is None:
+                    event = self.inflight_sync[key] = threading.Event()
+                    break
+            # Another thread is fetching; a failed fetch leaves nothing cached
+            # and the next loop makes this thread try itself
+            event.wait()
+
+        try:
+            value = self.get_shared_sync(key)
+            if value is None:
+                value = function(*args, **kwargs)
+                self.set_shared_sync(name, key, value)
+            self.set_local(name, key, value)
+            return value
+        finally:
+            with self.lock:
+                del self.inflight_sync[key]
+            event.set()
+
+
+tool_cache = ToolCache(settings.TOOL_CACHE_REDIS_URL, settings.TOOL_CACHE_SIZE)
+
+
+def cached_tool(function):
+    """
+    Caches a deterministic tool by its name and normalised arguments. Put it
+    under the agent's tool decorator; the signature and docstring the model
+    sees are kept.
+    """
+    name = function.__name__
+    signature = inspect.signature(function)
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            arguments = normalise_arguments(signature, args, kwargs)
+            interceptor = tool_interceptor.get()
+            if interceptor is not None:
+                return await interceptor.call(
+                    name, arguments, function, *args, **kwargs
+                )
+            key = tool_cache.key(name, arguments)
+            return await tool_cache.call(name, key, function, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        arguments = normalise_arguments(signature, args, kwargs)
+        interceptor = tool_interceptor.get()
+        if interceptor is not None:
+            return interceptor.call_sync(name, arguments, function, *args, **kwargs)
+        key = tool_cache.key(name, arguments)
+        return tool_cache.call_sync(name, key, function, *args, **kwargs)
+
+    return wrapper
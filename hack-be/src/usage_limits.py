@@ -0,0 +1,11 @@
+from pydantic_ai import UsageLimits
+
+# Per run limits for every agent entry point. A run that loops on tools is cut
+# off with UsageLimitExceeded instead of spending until the model gives up.
+AGENT_LIMITS: dict[str, UsageLimits] = {
+    "chat": UsageLimits(
+        request_limit=8, tool_calls_limit=12, total_tokens_limit=60_000
+    ),
+    "insights": UsageLimits(request_limit=2, total_tokens_limit=15_000),
+    "flights": UsageLimits(request_limit=15),
+}
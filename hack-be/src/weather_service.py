@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+
+import niquests
+import openmeteo_requests
+
+from src.batching import MicroBatcher
+from src.config import settings
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+CURRENT_VARIABLES = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "wind_speed_10m",
+]
+
+# One session for the whole process, so tool calls reuse pooled connections
+# instead of paying for DNS, TCP and TLS every time
+_session: niquests.AsyncSession | None = None
+_client: openmeteo_requests.AsyncClient | None = None
+
+
+class WeatherError(Exception):
+    pass
+
+
+@dataclass
+class CurrentWeather:
+    latitude: float
+    longitude: float
+    time: int
+    temperature_2m: float
+    relative_humidity_2m: float
+    precipitation: float
+    wind_speed_10m: float
+
+    def describe(self) -> str:
+        return (
+            f"The current temperature is {self.temperature_2m:.1f}°C with a humidity "
+            f"of {self.relative_humidity_2m:.0f}%, {self.precipitation:.1f} mm of "
+            f"precipitation and wind at {self.wind_speed_10m:.1f} km/h."
+        )
+
+
+def client() -> openmeteo_requests.AsyncClient:
+    global _session, _client
+    if _client is None:
+        _session = niquests.AsyncSession()
+        _client = openmeteo_requests.AsyncClient(_session)
+    return _client
+
+
+async def fetch_current(locations: list[tuple[float, float]]) -> list[CurrentWeather]:
+    """Current conditions for several locations in one Open-Meteo request."""
+    params = {
+        "latitude": [latitude for latitude, _ in locations],
+        "longitude": [longitude for _, longitude in locations],
+        "current": CURRENT_VARIABLES,
+    }
+    try:
+        responses = await client().weather_api(
+            FORECAST_URL, params=params, timeout=settings.WEATHER_TIMEOUT_SECONDS
+        )
+    except openmeteo_requests.OpenMeteoRequestsError as e:
+        raise WeatherError(str(e)) from e
+
+    results = []
+    # Responses come back in the order the locations were requested; a short
+    # response must fail rather than give weather to the wrong locations
+    for (latitude, longitude), response in zip(locations, responses, strict=True):
+        current = response.Current()
+        values = [current.Variables(i).Value() for i in range(len(CURRENT_VARIABLES))]
+        results.append(
+            CurrentWeather(latitude, longitude, current.Time(), *values)  # type: ignore
+        )
+    return results
+
+
+async def _fetch_many(_group, locations: list[tuple[float, float]]) -> dict:
+    return dict(zip(locations, await fetch_current(locations), strict=True))
+
+
+# Locations asked for at about the same time go out as one request
+_batcher = MicroBatcher(_fetch_many)
+
+
+async def current_weather(latitude: float, longitude: float) -> CurrentWeather:
+    return await _batcher.submit(None, (round(latitude, 4), round(longitude, 4)))
+
+
+async def close() -> None:
+    global _session, _client
+    if _session is not None:
+        await _session.close()
+        _session = _client = None
@@ -25,6 +25,7 @@ import {
 } from "lucide-react";
 import Image from "next/image";
 import { useChat } from "ai/react";
+import { backendFetch } from "@/lib/backend";
 interface UploadedFile {
   name: string;
   size: number;
@@ -52,31 +53,61 @@ export function UserGuidance() {
   ]);
   const [text, setText] = useState("");
   const [loading, setLoading] = useState(false);
+  const [conversationId, setConversationId] = useState<string | null>(null);
 
   const startStream = async () => {
     setText("");
     setLoading(true);
 
-    const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URI}/stream/chat/`, {
+    const response = await backendFetch("/stream/chat/", {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
       body: JSON.stringify({
         prompt: message,
+        conversation_id: conversationId,
+        // Opening questions repeat a lot, let the backend answer them from its cache
+        cache: conversationId === null,
       }),
     });
+    if (!response.ok) {
+      // The chat needs a signed-in user, its history is private to them
+      const detail = response.status === 401 || response.status === 403 ? "Please sign in to chat." : "The assistant is unavailable, try again later.";
+      setMessages((prev) => [...prev, { type: "ai", content: detail, timestamp: new Date() }]);
+      setLoading(false);
+      return;
+    }
+    setConversationId(response.headers.get("X-Conversation-Id"));
     const reader = response.body?.getReader();
     const decoder = new TextDecoder();
 
     if (!reader) return;
     let tempText = "";
+    let buffer = "";
     while (true) {
       const { done, value } = await reader.read();
       if (done) break;
-      const chunk = decoder.decode(value);
-      setText((prev) => prev + chunk);
-      tempText += chunk;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Server-Sent Events are separated by a blank line, keep any partial event
+      const events = buffer.split("\n\n");
+      buffer = events.pop() ?? "";
+      for (const raw of events) {
+        let event = "message";
+        let data = "";
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        if (event === "delta") {
+          const { text: delta } = JSON.parse(data);
+          setText((prev) => prev + delta);
+          tempText += delta;
+        } else if (event === "error") {
+          tempText += `\n\n${JSON.parse(data).detail}`;
+        }
+      }
     }
 
     setMessages((prev) => [...prev, { type: "ai", content: tempText, timestamp: new Date() }]);
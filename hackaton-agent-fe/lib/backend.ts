@@ -0,0 +1,52 @@
+// Requests to the FastAPI backend. The access token lives a few minutes in an
+// httpOnly cookie; it is renewed through /login/refresh, which also rotates the
+// refresh cookie, shortly before it runs out and once more when a request is
+// refused.
+
+const BACKEND_URI = process.env.NEXT_PUBLIC_BACKEND_URI
+
+// Renew this long before the access token expires
+const REFRESH_MARGIN_MS = 60_000
+
+let expiresAt = 0
+// Without a refresh cookie there is nothing to renew ahead of time
+let anonymous = false
+let refreshing: Promise<boolean> | null = null
+
+export function setSession(expiresIn: number) {
+  expiresAt = Date.now() + expiresIn * 1000
+  anonymous = false
+}
+
+export function refreshSession(): Promise<boolean> {
+  // Concurrent callers share one refresh: a refresh token can be used only once
+  if (!refreshing) {
+    refreshing = fetch(`${BACKEND_URI}/login/refresh`, { method: "POST", credentials: "include" })
+      .then(async (response) => {
+        if (!response.ok) {
+          anonymous = true
+          return false
+        }
+        setSession((await response.json()).expires_in)
+        return true
+      })
+      .catch(() => false)
+      .finally(() => {
+        refreshing = null
+      })
+  }
+  return refreshing
+}
+
+// fetch with the session cookies. init.body must be replayable (a string, not a stream)
+export async function backendFetch(path: string, init: RequestInit = {}): Promise<Response> {
+  if (!anonymous && Date.now() > expiresAt - REFRESH_MARGIN_MS) {
+    await refreshSession()
+  }
+  const send = () => fetch(`${BACKEND_URI}${path}`, { ...init, credentials: "include" })
+  const response = await send()
+  if ((response.status === 401 || response.status === 403) && (await refreshSession())) {
+    return send()
+  }
+  return response
+}
@@ -0,0 +1,16 @@
+-- Chat history for the streaming agent, one row per agent run
+CREATE TABLE IF NOT EXISTS chat_messages (
+  id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  user_id VARCHAR(255) NOT NULL, -- username of the owner, history is only read back by them
+  conversation_id UUID NOT NULL,
+  messages JSONB NOT NULL, -- serialized pydantic-ai ModelMessage list of the run
+  token_estimate INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Tables created before runs had an owner; their runs are readable by no one
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS user_id VARCHAR(255);
+
+-- History is always read newest first within one user's conversation
+DROP INDEX IF EXISTS idx_chat_messages_conversation;
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user_conversation ON chat_messages(user_id, conversation_id, id DESC);
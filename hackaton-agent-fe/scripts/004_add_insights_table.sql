@@ -0,0 +1,14 @@
+-- AI insights shown on the dashboard, written by the backend insight pipeline
+CREATE TABLE IF NOT EXISTS insights (
+  id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  type TEXT NOT NULL CHECK (type IN ('optimization', 'alert', 'recommendation', 'insight')),
+  title TEXT NOT NULL,
+  description TEXT NOT NULL,
+  confidence INTEGER,
+  impact TEXT CHECK (impact IN ('High', 'Medium', 'Low')),
+  color TEXT,
+  bg_color TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_insights_created_at ON insights(created_at DESC);